@@ -0,0 +1,60 @@
+"""
+Renders looping animations and reports frames per second, to judge which
+loop lengths, sizes and output formats are practical.
+
+Usage: python benchmarks/bench_animation.py [--size 2560x1440] [--frames 60]
+           [--workers 1,4] [--formats frames,apng,webp] [--preset fast]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from wpgen import animate  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="2560x1440")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument("--formats", default="frames,apng,webp")
+    parser.add_argument("--animations", default="mesh_drift,gradient_rotate")
+    parser.add_argument("--preset", default="fast")
+    parser.add_argument("--noise", type=float, default=0.0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    worker_counts = sorted({int(w) for w in args.workers.split(",")})
+
+    print(
+        f"{'animation':16} {'format':7} {'workers':>7} {'frames/s':>9} "
+        f"{'total s':>8} {'encode s':>9} {'size':>10}"
+    )
+    for animation in args.animations.split(","):
+        for fmt in args.formats.split(","):
+            for workers in worker_counts:
+                with tempfile.TemporaryDirectory() as tmp:
+                    config = {
+                        "mode": "animated",
+                        "animation": animation,
+                        "colors": ["#ff79c6", "#bd93f9", "#8be9fd"],
+                        "noise": args.noise,
+                        "frames": args.frames,
+                        "animation_format": fmt,
+                        "preset": args.preset,
+                        "workers": workers,
+                        "output_dir": tmp,
+                    }
+                    result = animate.render_animation(width, height, config)
+                print(
+                    f"{animation:16} {fmt:7} {workers:7d} {result.fps:9.2f} "
+                    f"{result.wall_seconds:8.2f} {result.seconds:9.2f} "
+                    f"{result.bytes / 1024:8.0f}KiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares the ImageEnhance chain with the fused adjust_colors stage.
+
+Usage: python benchmarks/bench_color_adjust.py [--size 2560x1440] [--repeat 7]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from wpgen import generator  # noqa: E402
+
+CASES = [
+    ("brightness", (1.2, 1.0, 1.0)),
+    ("brightness+contrast", (1.2, 1.3, 1.0)),
+    ("brightness+contrast+saturation", (1.2, 1.3, 0.7)),
+]
+
+
+def chained(img, brightness, contrast, saturation):
+    img = generator.apply_brightness(img, brightness)
+    img = generator.apply_contrast(img, contrast)
+    return generator.apply_saturation(img, saturation)
+
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="2560x1440")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    img = generator.create_mesh_gradient(
+        width, height, ["#ff79c6", "#bd93f9", "#8be9fd"], rng=generator.make_rngs(42)[0]
+    )
+
+    print(f"{'adjustments':32} {'chained':>10} {'fused':>10} {'speedup':>8}")
+    for name, factors in CASES:
+        before = median_ms(lambda: chained(img, *factors), args.repeat)
+        after = median_ms(lambda: generator.adjust_colors(img, *factors), args.repeat)
+        print(f"{name:32} {before:8.1f}ms {after:8.1f}ms {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Times the effects chain per thread count, to show how the band-parallel
+chain (config 'threads') scales on the cores at hand.
+
+Every stage is timed on its own and as the full chain, on the same mesh
+background, and the threaded output is checked against the serial one.
+Speedup is relative to the serial chain (1 thread). The chain never runs
+on more threads than there are CPUs, so counts above that repeat the
+largest one.
+
+Usage: python benchmarks/bench_effects.py [--size 3840x2160] [--threads 1,2,4,8]
+           [--repeat 3] [--blur 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np  # noqa: E402
+
+from wpgen import generator  # noqa: E402
+
+
+def chains(blur):
+    """Returns (name, effect config) pairs: every stage alone, then all of them."""
+    full = {
+        "noise": 0.05,
+        "blur": blur,
+        "brightness": 1.1,
+        "contrast": 1.2,
+        "saturation": 0.9,
+        "sharpness": 1.5,
+    }
+    return [
+        ("grain", {"noise": 0.05}),
+        ("blur", {"blur": blur}),
+        ("color", {"brightness": 1.1, "contrast": 1.2, "saturation": 0.9}),
+        ("sharpness", {"sharpness": 1.5}),
+        ("full chain", full),
+    ]
+
+
+def time_chain(background, config, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = generator.apply_effects(background, config)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), img
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cpus})
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="3840x2160")
+    parser.add_argument("--threads", default=",".join(str(c) for c in counts))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--blur", type=float, default=4.0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    thread_counts = sorted({int(t) for t in args.threads.split(",")} | {1})
+    background = generator.create_background(
+        width,
+        height,
+        {"mode": "gradient_mesh", "colors": ["#ff79c6", "#bd93f9", "#8be9fd"]},
+        generator.make_rngs(42)[0],
+    )
+
+    print(f"{width}x{height}, {cpus} CPUs")
+    print(f"{'stage':12} {'threads':>7} {'median ms':>10} {'speedup':>8}  output")
+    for name, effects in chains(args.blur):
+        serial = None
+        for threads in thread_counts:
+            config = dict(effects, seed=42, threads=threads)
+            seconds, img = time_chain(background, config, args.repeat)
+            pixels = np.asarray(img)
+            if serial is None:
+                serial = (seconds, pixels)
+            same = "identical" if np.array_equal(pixels, serial[1]) else "DIFFERS"
+            print(
+                f"{name:12} {threads:7d} {seconds * 1000:10.1f} "
+                f"{serial[0] / seconds:7.2f}x  {same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Encodes one rendered frame with every output format and preset and reports
+encode time and file size, to pick a trade-off per deployment.
+
+Usage: python benchmarks/bench_encoders.py [--size 2560x1440] [--noise 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from wpgen import encoders, generator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="2560x1440")
+    parser.add_argument("--mode", default="gradient_mesh")
+    parser.add_argument("--noise", type=float, default=0.0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    config = {
+        "mode": args.mode,
+        "colors": ["#ff79c6", "#bd93f9", "#8be9fd"],
+        "noise": args.noise,
+    }
+    img = generator.render_wallpaper(width, height, config)
+    raw_bytes = width * height * 3
+
+    print(f"{'format':8} {'preset':10} {'time':>10} {'size':>10} {'ratio':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, presets in encoders.PRESETS.items():
+            if not encoders.supported(fmt):
+                print(f"{fmt:8} (not supported by this Pillow build)")
+                continue
+            for preset in presets:
+                path = os.path.join(tmp, f"frame{encoders.extension(fmt)}")
+                result = encoders.encode(img, path, fmt, preset)
+                print(
+                    f"{fmt:8} {preset:10} {result.seconds * 1000:8.1f}ms "
+                    f"{result.bytes / 1024:8.0f}KiB {raw_bytes / result.bytes:6.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
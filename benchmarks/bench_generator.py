@@ -0,0 +1,223 @@
+"""
+Benchmarks every generator primitive across output resolutions.
+
+Reports median/p95 wall time and peak memory per case, can save the results
+as a JSON baseline and compare a later run against it, failing (exit 1) when
+a case regresses beyond the threshold.
+
+Usage:
+    python benchmarks/bench_generator.py --save baseline.json
+    python benchmarks/bench_generator.py --compare baseline.json --threshold 0.15
+    python benchmarks/bench_generator.py --resolutions 1080p,4k --filter noise
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np  # noqa: E402
+import PIL  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from wpgen import encoders, generator, grain, instrument, ramps  # noqa: E402
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+COLORS = ["#ff79c6", "#bd93f9", "#8be9fd"]
+DIRECTIONS = ["vertical", "horizontal", "diagonal_tl_br", "diagonal_tr_bl", "radial"]
+
+
+def build_cases(width, height, workdir):
+    """Returns (name, callable) pairs for one resolution."""
+    rng, np_rng = generator.make_rngs(42)
+    frame = generator.create_mesh_gradient(width, height, COLORS, rng=rng)
+    logo_path = os.path.join(workdir, "logo.png")
+    if not os.path.exists(logo_path):
+        logo = Image.new("RGBA", (400, 400), (255, 255, 255, 0))
+        logo.paste((255, 255, 255, 200), (100, 100, 300, 300))
+        logo.save(logo_path)
+    out_path = os.path.join(workdir, "frame.png")
+
+    cases = [
+        ("create_solid_background", lambda: generator.create_solid_background(
+            width, height, COLORS[0])),
+    ]
+    for direction in DIRECTIONS:
+        cases.append((f"create_linear_gradient[{direction}]", lambda d=direction: (
+            generator.create_linear_gradient(width, height, COLORS[0], COLORS[1], d))))
+    for interpolation in ramps.INTERPOLATIONS:
+        ramp = ramps.color_ramp(
+            [generator.hex_to_rgb(c) for c in COLORS], None, interpolation
+        )
+        cases.append((f"create_ramp_gradient[{interpolation}]", lambda r=ramp: (
+            generator.create_ramp_gradient(width, height, r, "diagonal_tl_br"))))
+    dithered = ramps.color_ramp(
+        [generator.hex_to_rgb(c) for c in COLORS], None, "oklab", fixed=True
+    )
+    cases.append(("create_ramp_gradient[oklab, dithered]", lambda: (
+        generator.create_ramp_gradient(width, height, dithered, "diagonal_tl_br"))))
+    for size in ["small", "medium", "large"]:
+        cases.append((f"create_mesh_gradient[{size}]", lambda s=size: (
+            generator.create_mesh_gradient(
+                width, height, COLORS, blob_size=s, rng=generator.make_rngs(42)[0]))))
+        cases.append((f"create_field_mesh_gradient[{size}]", lambda s=size: (
+            generator.create_field_mesh_gradient(
+                width, height, COLORS, blob_size=s, rng=generator.make_rngs(42)[0]))))
+    cases += [
+        ("apply_noise", lambda: generator.apply_noise(frame, 0.05, np_rng)),
+        ("add_grain", lambda: grain.add_grain(frame, 0.05, 42)),
+        ("apply_blur", lambda: generator.apply_blur(frame, 3)),
+        ("apply_brightness", lambda: generator.apply_brightness(frame, 1.2)),
+        ("apply_contrast", lambda: generator.apply_contrast(frame, 1.3)),
+        ("apply_saturation", lambda: generator.apply_saturation(frame, 0.7)),
+        ("apply_sharpness", lambda: generator.apply_sharpness(frame, 1.5)),
+        ("adjust_colors", lambda: generator.adjust_colors(frame, 1.2, 1.3, 0.7)),
+        ("composite_logo", lambda: generator.composite_logo(
+            frame.copy(), logo_path, "center")),
+        ("save_png", lambda: encoders.encode(frame, out_path)),
+    ]
+    return cases
+
+
+def measure(func, repeat):
+    """
+    Runs func repeat times after one warm-up call. Returns the wall times in
+    seconds and the peak memory of one call in bytes: peak RSS growth where
+    the kernel allows resetting the watermark (this includes PIL's buffers),
+    Python-tracked allocations otherwise.
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    instrument.trim_heap()
+    if instrument.reset_peak_rss():
+        before = instrument.current_rss()
+        func()
+        peak = instrument.peak_rss() - before
+    else:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return times, max(peak, 0)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run(resolution_names, repeat, name_filter):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for res_name in resolution_names:
+            width, height = RESOLUTIONS[res_name]
+            for name, func in build_cases(width, height, workdir):
+                if name_filter and name_filter not in name:
+                    continue
+                times, peak = measure(func, repeat)
+                key = f"{name}@{res_name}"
+                results[key] = {
+                    "median_ms": statistics.median(times) * 1000,
+                    "p95_ms": percentile(times, 0.95) * 1000,
+                    "peak_mb": peak / (1024 * 1024),
+                }
+                r = results[key]
+                print(
+                    f"{key:44} {r['median_ms']:10.1f} {r['p95_ms']:10.1f} "
+                    f"{r['peak_mb']:9.1f}",
+                    flush=True,
+                )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints cases slower or hungrier than baseline by more than threshold."""
+    regressions = 0
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ("median_ms", "peak_mb"):
+            before, after = previous[metric], current[metric]
+            # Ignore sub-millisecond/megabyte jitter around zero
+            if after > before * (1 + threshold) and after - before > 1.0:
+                regressions += 1
+                print(f"REGRESSION {key} {metric}: {before:.1f} -> {after:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument(
+        "--resolutions",
+        default=",".join(RESOLUTIONS),
+        help="comma-separated subset of " + ", ".join(RESOLUTIONS),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown/memory growth (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    names = [n.strip().lower() for n in args.resolutions.split(",") if n.strip()]
+    unknown = [n for n in names if n not in RESOLUTIONS]
+    if unknown:
+        parser.error(f"unknown resolutions: {', '.join(unknown)}")
+
+    print(f"{'case':44} {'median ms':>10} {'p95 ms':>10} {'peak MB':>9}")
+    results = run(names, args.repeat, args.filter)
+
+    if args.save:
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pillow": PIL.__version__,
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
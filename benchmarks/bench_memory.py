@@ -0,0 +1,133 @@
+"""
+Measures the peak RSS of single renders in the standard, low-memory
+(config 'low_memory') and strip-wise (config 'tile_rows') pipelines.
+
+Every render is rendered and saved as PNG in a fresh process, as a worker
+would, and reports the process's peak RSS over the render (see
+instrument.PeakWindow) next to the RSS it started from. The pixels of the
+other pipelines are checked against the standard one.
+
+Before that, the low-memory pipeline is held to its tolerance against the
+standard one: zero, for every case, mesh engine and dither setting, at
+CHECK_SIZES (odd sizes included, where band-wise resampling would round
+differently). The script exits with status 1 if any pixel differs.
+
+Usage: python benchmarks/bench_memory.py [--size 3840x2160] [--tile-rows 256]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from wpgen import generator, instrument, lowmem  # noqa: E402
+
+MESH = {"mode": "gradient_mesh", "colors": ["#ff79c6", "#bd93f9", "#8be9fd"]}
+RADIAL = {
+    "mode": "gradient_linear",
+    "colors": ["#282a36", "#6272a4"],
+    "gradient_direction": "radial",
+}
+EFFECTS = {
+    "noise": 0.05,
+    "blur": 4,
+    "brightness": 1.1,
+    "contrast": 1.2,
+    "saturation": 0.9,
+    "sharpness": 1.5,
+}
+CASES = [
+    ("mesh", MESH),
+    ("mesh + effects", dict(MESH, **EFFECTS)),
+    ("mesh + classic noise", dict(MESH, **EFFECTS, noise_engine="classic")),
+    ("radial + grain", dict(RADIAL, noise=0.05)),
+]
+
+# Largest difference per channel value allowed between the low-memory and
+# the standard pipeline
+TOLERANCE = 0
+CHECK_SIZES = [(640, 400), (640, 129), (800, 601), (1000, 700), (1366, 768)]
+
+
+def check_low_memory():
+    """Prints and returns the largest low-memory difference over all checks."""
+    worst = 0
+    variants = [("classic", False), ("field", False), ("classic", True)]
+    for _, case in CASES:
+        for engine, dithered in variants:
+            config = dict(case, seed=7, mesh_engine=engine, dither=dithered)
+            for width, height in CHECK_SIZES:
+                standard = generator.render_wallpaper(width, height, config)
+                frame = lowmem.render_frame(width, height, config)
+                diff = np.abs(np.asarray(standard, dtype=np.int16) - frame).max()
+                worst = max(worst, int(diff))
+    print(f"low_memory vs standard: largest difference {worst} (tolerance {TOLERANCE})")
+    return worst
+
+
+def measure(width, height, config):
+    # Runs in a fresh process
+    with tempfile.TemporaryDirectory() as tmp:
+        config = dict(config, output_dir=tmp, cache=False)
+        start_rss = instrument.current_rss()
+        start = time.perf_counter()
+        with instrument.PeakWindow() as window:
+            (path,) = generator.render_task(config, [(width, height)])
+        seconds = time.perf_counter() - start
+        with Image.open(path) as img:
+            pixels = hashlib.sha256(np.asarray(img.convert("RGB")).tobytes())
+    return window.peak, start_rss, seconds, pixels.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="3840x2160")
+    parser.add_argument("--tile-rows", type=int, default=256)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    if check_low_memory() > TOLERANCE:
+        return 1
+    pipelines = [
+        ("standard", {}),
+        ("low_memory", {"low_memory": True}),
+        (f"tile_rows={args.tile_rows}", {"tile_rows": args.tile_rows}),
+    ]
+    context = multiprocessing.get_context("spawn")
+    mb = 1024 * 1024
+
+    print(f"{width}x{height}")
+    print(
+        f"{'case':22} {'pipeline':14} {'peak MB':>8} {'start MB':>9} {'ms':>8}  "
+        "output"
+    )
+    for name, config in CASES:
+        standard = None
+        for pipeline, extra in pipelines:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                peak, start_rss, seconds, pixels = pool.submit(
+                    measure, width, height, dict(config, seed=42, **extra)
+                ).result()
+            standard = standard or pixels
+            if pipeline == "standard":
+                same = ""
+            else:
+                same = "identical" if pixels == standard else "differs"
+            peak = f"{peak / mb:8.1f}" if peak else f"{'n/a':>8}"
+            print(
+                f"{name:22} {pipeline:14} {peak} {start_rss / mb:9.1f} "
+                f"{seconds * 1000:8.1f}  {same}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
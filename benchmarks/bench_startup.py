@@ -0,0 +1,163 @@
+"""
+Measures the start-up cost of wpgen's entry points.
+
+Every case runs in a fresh interpreter under `python -X importtime`. It
+reports the median wall time of the process and the import time of wpgen's
+own modules. It also shows which heavy dependencies (NumPy, PIL, Textual)
+got loaded, so an eager import on a light path shows up right away. Can
+save a JSON baseline and fail (exit 1) when a case regresses beyond the
+threshold.
+
+Usage:
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --compare startup.json --threshold 0.2
+    python benchmarks/bench_startup.py --top 10 --filter tui
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Case name -> interpreter arguments
+CASES = {
+    "python (baseline)": ["-c", "pass"],
+    "wpgen --help": ["-m", "wpgen", "--help"],
+    "wpgen render (client)": ["-c", "import wpgen.cli, wpgen.client"],
+    "import wpgen.tui": ["-c", "import wpgen.tui"],
+    "import wpgen.generator": ["-c", "import wpgen.generator"],
+    "import wpgen.serve": ["-c", "import wpgen.serve"],
+}
+
+HEAVY = ("numpy", "PIL", "textual")
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self us, cumulative us, depth)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line
+        # One space before top-level names, two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def run_case(args, repeat):
+    # -c puts the working directory first on sys.path, so run from ROOT too
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        walls.append(time.perf_counter() - start)
+    # Import tracing slows the interpreter down, so it gets its own run
+    traced = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(traced.stderr)
+    top_level = {name: v for name, v in modules.items() if v[2] == 0}
+    wpgen_us = sum(v[1] for name, v in top_level.items() if name.startswith("wpgen"))
+    return {
+        "wall_ms": statistics.median(walls) * 1000,
+        "import_ms": wpgen_us / 1000,
+        "modules": len(modules),
+        "heavy": [h for h in HEAVY if h in modules],
+        "top": sorted(top_level.items(), key=lambda item: -item[1][1]),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints cases slower than baseline by more than threshold."""
+    regressions = 0
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ("wall_ms", "import_ms"):
+            before, after = previous[metric], current[metric]
+            # Ignore jitter of a few milliseconds
+            if after > before * (1 + threshold) and after - before > 5.0:
+                regressions += 1
+                print(f"REGRESSION {key} {metric}: {before:.1f} -> {after:.1f}")
+        for heavy in set(current["heavy"]) - set(previous["heavy"]):
+            regressions += 1
+            print(f"REGRESSION {key} now imports {heavy}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument(
+        "--top", type=int, default=0, help="list the N slowest top-level imports"
+    )
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'case':24} {'wall ms':>8} {'wpgen ms':>9} {'modules':>8}  heavy imports")
+    results = {}
+    for name, case_args in CASES.items():
+        if args.filter not in name:
+            continue
+        result = run_case(case_args, args.repeat)
+        print(
+            f"{name:24} {result['wall_ms']:8.1f} {result['import_ms']:9.1f} "
+            f"{result['modules']:8d}  {', '.join(result['heavy']) or '-'}"
+        )
+        for module, (_, cumulative_us, _) in result.pop("top")[: args.top]:
+            print(f"    {module:36} {cumulative_us / 1000:8.1f} ms")
+        results[name] = result
+
+    if args.save:
+        report = {
+            "environment": {"python": sys.version.split()[0], "cpus": os.cpu_count()},
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
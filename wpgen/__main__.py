@@ -0,0 +1,3 @@
+from wpgen.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,239 @@
+"""
+Looping animated wallpapers (mode 'animated').
+
+Settings, besides the usual colours, mesh options and effects:
+    'animation': 'mesh_drift' | 'gradient_rotate',  # Default: 'mesh_drift'
+    'frames': int,  # Frames per loop (default: 60)
+    'fps': float,  # Playback rate (default: 30)
+    'drift': float,  # Blob orbit size in image widths (default: 0.1)
+    'animation_format': 'webp' | 'apng' | 'frames',  # Default: 'webp'
+
+'mesh_drift' moves the blobs of a field mesh gradient along closed orbits;
+'gradient_rotate' turns a linear gradient (stops and interpolation
+included) once around per loop. Both end where they started, so the output
+loops seamlessly. 'frames' writes wallpaper_WxH_frames/frame_0000.png etc.;
+webp and apng hold every frame in memory until the file is encoded.
+
+Everything that does not change between frames is computed once per
+animation: blob placement and orbits, the gradient's centred coordinate
+ramps and its solid end colours. Per frame only the blob fields are
+re-evaluated, on the small field canvas, and the gradient's progress is
+recombined from the stored ramps. Frames are independent of each other and
+are rendered in 'workers' processes when that is above 1.
+"""
+
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from wpgen import encoders, generator
+from wpgen.instrument import span
+
+DEFAULT_FRAMES = 60
+DEFAULT_FPS = 30
+DEFAULT_DRIFT = 0.1
+
+
+class AnimationResult(NamedTuple):
+    """EncodeResult of an animation, plus its frame count and throughput."""
+
+    path: str
+    format: str
+    seconds: float  # Encoding the animation file (frame PNGs: summed)
+    bytes: int
+    frames: int
+    wall_seconds: float  # Rendering and encoding, end to end
+
+    @property
+    def fps(self):
+        return self.frames / self.wall_seconds if self.wall_seconds else 0.0
+
+
+class Animation:
+    """Per-animation state shared by every frame of one resolution."""
+
+    def __init__(self, width, height, config, rng=None):
+        rng = rng or random.Random(config.get("seed", 42))
+        self.width = width
+        self.height = height
+        self.config = config
+        self.kind = config.get("animation", "mesh_drift")
+        colors = config.get("colors", ["#000000"])
+
+        if self.kind == "mesh_drift":
+            self.base_color = generator.hex_to_rgb(colors[0])
+            self.blur_intensity = config.get("mesh_blur_intensity", 1.0)
+            self.blobs = generator.mesh_field_blobs(
+                colors,
+                config.get("mesh_blob_count"),
+                config.get("mesh_blob_size", "medium"),
+                rng,
+            )
+            drift = config.get("drift", DEFAULT_DRIFT)
+            # Per blob: orbit radii (widths), phase and turning direction
+            self.orbits = [
+                (
+                    drift * rng.uniform(0.5, 1.0),
+                    drift * rng.uniform(0.5, 1.0),
+                    rng.uniform(0, 2 * math.pi),
+                    rng.choice((-1, 1)),
+                )
+                for _ in self.blobs
+            ]
+            self.canvas_size = generator.field_canvas_size(width, height)
+        elif self.kind == "gradient_rotate":
+            # Multi-stop gradients map progress through a ramp instead
+            self.ramp = generator.gradient_ramp(config)
+            if self.ramp is None:
+                c1 = colors[0]
+                c2 = colors[1] if len(colors) > 1 else colors[0]
+                size = (width, height)
+                self.start = Image.new("RGB", size, generator.hex_to_rgb(c1))
+                self.end = Image.new("RGB", size, generator.hex_to_rgb(c2))
+            # Centred pixel coordinates, scaled so progress stays in 0..1
+            # at every angle
+            reach = 2 * math.hypot(width / 2, height / 2)
+            self.xs = (np.arange(width, dtype=np.float32) - width / 2 + 0.5) / reach
+            self.ys = (np.arange(height, dtype=np.float32) - height / 2 + 0.5) / reach
+            self.angle = rng.uniform(0, 2 * math.pi)
+        else:
+            raise ValueError(f"Unknown animation: {self.kind}")
+
+    def background(self, t):
+        """Returns the background at loop position t (0.0 to 1.0)."""
+        if self.kind == "mesh_drift":
+            moved = []
+            for (x, y, radius, color), (ax, ay, phase, turn) in zip(
+                self.blobs, self.orbits
+            ):
+                theta = phase + turn * 2 * math.pi * t
+                moved.append(
+                    (
+                        x + ax * math.cos(theta),
+                        y + ay * math.sin(theta) * self.width / self.height,
+                        radius,
+                        color,
+                    )
+                )
+            precise = bool(self.config.get("dither"))
+            canvas = generator.render_mesh_field(
+                *self.canvas_size, self.base_color, moved, self.blur_intensity, precise
+            )
+            if precise:
+                return generator.upscale_mesh_dithered(canvas, self.width, self.height)
+            return generator.upscale_mesh(canvas, self.width, self.height)
+
+        theta = self.angle + 2 * math.pi * t
+        progress = (self.ys * np.float32(math.sin(theta)))[:, np.newaxis] + (
+            self.xs * np.float32(math.cos(theta))
+        )[np.newaxis, :]
+        progress += np.float32(0.5)
+        if self.ramp is not None:
+            return generator.ramp_image(progress, self.ramp)
+        progress *= np.float32(255)
+        mask = Image.fromarray(progress.astype(np.uint8), "L")
+        img = self.start.copy()
+        img.paste(self.end, (0, 0), mask)
+        return img
+
+    def frame(self, index, frames, recorder=None):
+        """Renders frame index of frames, effects and logo included."""
+        config = self.config
+        with span(recorder, "background", self.width, self.height):
+            img = self.background(index / frames)
+        # Classic noise gets its own stream per frame, so frames do not
+        # depend on which process renders them
+        np_rng = np.random.RandomState((config.get("seed", 42) + index) % 2**32)
+        img = generator.apply_effects(img, config, np_rng=np_rng, recorder=recorder)
+        return generator.finish_wallpaper(img, config, recorder)
+
+
+def frame_path(directory, index):
+    return os.path.join(directory, f"frame_{index:04d}.png")
+
+
+def _render_frames(config, width, height, indices, frames_dir, recorder=None):
+    """
+    Renders the given frame indices. Writes them to frames_dir and returns
+    their EncodeResults if it is set; returns the frames as arrays otherwise.
+    """
+    animation = Animation(width, height, config)
+    frames = int(config.get("frames", DEFAULT_FRAMES))
+    results = []
+    for index in indices:
+        img = animation.frame(index, frames, recorder)
+        if frames_dir:
+            with span(recorder, "encode", width, height):
+                results.append(
+                    encoders.encode(
+                        img,
+                        frame_path(frames_dir, index),
+                        "png",
+                        config.get("preset", "balanced"),
+                        config.get("encoder_options"),
+                    )
+                )
+        else:
+            results.append(np.asarray(img))
+    return results
+
+
+def render_animation(width, height, config, recorder=None):
+    """
+    Renders and saves the animation of config at width x height and
+    returns an AnimationResult. With config['workers'] above 1 the frames
+    are split into contiguous chunks rendered in that many processes.
+    """
+    if config.get("seed", 42) is None:
+        # Every process must build the same animation
+        config = dict(config, seed=random.randrange(2**32))
+    frames = int(config.get("frames", DEFAULT_FRAMES))
+    if frames < 1:
+        raise ValueError("An animation needs at least one frame")
+    fmt = config.get("animation_format", "webp")
+    path = generator.output_path(config, width, height)
+    frames_dir = path if fmt == "frames" else None
+    os.makedirs(frames_dir or os.path.dirname(path) or ".", exist_ok=True)
+
+    start = time.perf_counter()
+    workers = min(config.get("workers") or 1, frames)
+    if workers > 1:
+        chunk = -(-frames // (workers * 2))
+        chunks = [range(i, min(frames, i + chunk)) for i in range(0, frames, chunk)]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_render_frames, config, width, height, c, frames_dir)
+                for c in chunks
+            ]
+            results = [r for future in futures for r in future.result()]
+    else:
+        results = _render_frames(
+            config, width, height, range(frames), frames_dir, recorder
+        )
+
+    if frames_dir:
+        seconds = sum(r.seconds for r in results)
+        size = sum(r.bytes for r in results)
+    else:
+        images = [Image.fromarray(pixels) for pixels in results]
+        del results
+        with span(recorder, "encode", width, height):
+            encoded = encoders.encode_animation(
+                images,
+                path,
+                fmt,
+                config.get("preset", "balanced"),
+                config.get("encoder_options"),
+                duration=round(1000 / config.get("fps", DEFAULT_FPS)),
+            )
+        seconds, size = encoded.seconds, encoded.bytes
+    wall = time.perf_counter() - start
+    return AnimationResult(path, fmt, seconds, size, frames, wall)
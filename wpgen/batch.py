@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import time
+
+from wpgen import generator, parallel
+
+
+def iter_manifest(path, on_error=None):
+    """
+    Yields the generate_wallpaper config dicts of a manifest.
+
+    JSONL manifests (one config object per line, blank lines and lines
+    starting with '#' ignored) are read lazily line by line. TOML manifests
+    list their configs as [[job]] tables; tomllib has no streaming parser,
+    so they are loaded whole and are best kept for small job lists.
+
+    A line that is not a JSON object (or a [[job]] entry that is not a
+    table) raises ValueError, or is skipped after passing that error to
+    on_error, if given.
+    """
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+
+        with open(path, "rb") as f:
+            jobs = tomllib.load(f).get("job", [])
+        for number, job in enumerate(jobs if isinstance(jobs, list) else [jobs], 1):
+            if isinstance(job, dict):
+                yield job
+                continue
+            error = ValueError(f"{path}: job {number} must be a [[job]] table")
+            if on_error is None:
+                raise error
+            on_error(error)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                error = ValueError(f"{path}:{lineno}: invalid JSON: {e}")
+            else:
+                if isinstance(job, dict):
+                    yield job
+                    continue
+                error = ValueError(f"{path}:{lineno}: a job must be a JSON object")
+            if on_error is None:
+                raise error
+            on_error(error)
+
+
+def check_name(name):
+    """
+    Raises ValueError unless name is a plain directory name, so a job can
+    never write outside the batch's output directory.
+    """
+    separators = {os.sep, "/", os.altsep} - {None}
+    if name in ("", ".", "..") or any(sep in name for sep in separators):
+        raise ValueError("a job name must be a plain directory name")
+
+
+def iter_jobs(manifest, output_dir, cache=True, defaults=None, on_error=None):
+    """
+    Turns manifest configs into batch jobs: each job writes into its own
+    directory under output_dir, named after its 'name' key or its position.
+    defaults fills in keys a job does not set itself. With cache=False the
+    render cache is bypassed for every job.
+
+    A job with an unsafe name (see check_name) or invalid resolutions
+    raises ValueError, or is skipped after passing that error to on_error,
+    if given.
+    """
+    for number, job in enumerate(manifest, 1):
+        config = {**(defaults or {}), **job}
+        name = str(config.pop("name", f"job_{number:05d}"))
+        try:
+            check_name(name)
+            generator.plan_tasks(config)
+        except ValueError as e:
+            if on_error is None:
+                raise ValueError(f"{name}: {e}") from None
+            on_error(ValueError(f"{name}: {e}"))
+            continue
+        config["output_dir"] = os.path.join(output_dir, name)
+        # The batch pool already runs jobs in parallel
+        config["workers"] = 1
+        if not cache:
+            config["cache"] = False
+        yield name, config
+
+
+def run_batch(
+    manifest_path,
+    output_dir=".",
+    workers=None,
+    cache=True,
+    defaults=None,
+    profile=False,
+    memory_budget=None,
+):
+    """
+    Renders every job of a manifest on a bounded process pool and prints a
+    throughput summary, plus per-stage totals with profile. memory_budget
+    caps the estimated peak RSS of the renders running at once (see
+    parallel.iter_results). Invalid jobs are reported and skipped. Returns
+    the number of failed render tasks plus the number of invalid jobs.
+    Raises OSError or ValueError if the manifest cannot be read at all.
+    """
+    if profile:
+        defaults = {**(defaults or {}), "instrument": True}
+
+    # Name and number of unfinished tasks of the jobs currently in flight
+    in_flight = {}
+    jobs = invalid = 0
+
+    def reject(error):
+        nonlocal invalid
+        invalid += 1
+        print(error, file=sys.stderr)
+
+    def configs():
+        nonlocal jobs
+        for name, config in iter_jobs(
+            iter_manifest(manifest_path, reject), output_dir, cache, defaults, reject
+        ):
+            in_flight[jobs] = [name, len(generator.plan_tasks(config))]
+            jobs += 1
+            yield config
+
+    images = failures = written = 0
+    encoded = encode_seconds = 0
+    frames = frame_seconds = 0
+    peak_rss = 0
+    # Stage name -> [wall seconds, cpu seconds, peak bytes]
+    stage_totals = {}
+    start = time.perf_counter()
+
+    for result in parallel.iter_results(
+        configs(), workers, memory_budget=memory_budget
+    ):
+        job = in_flight[result.index]
+        job[1] -= 1
+        if job[1] == 0:
+            del in_flight[result.index]
+
+        if result.error is not None:
+            failures += 1
+            print(f"{job[0]}: {result.error}", file=sys.stderr)
+            continue
+        peak_rss = max(peak_rss, result.peak_rss or 0)
+        for path in result.paths:
+            images += 1
+            if os.path.isdir(path):
+                # Frame sequence of an animation
+                for entry in os.scandir(path):
+                    written += entry.stat().st_size
+            else:
+                written += os.path.getsize(path)
+        for encode in result.encodes or []:
+            encoded += 1
+            encode_seconds += encode.seconds
+            frames += getattr(encode, "frames", 0)
+            frame_seconds += getattr(encode, "wall_seconds", 0.0)
+        for record in result.stages or []:
+            totals = stage_totals.setdefault(record.stage, [0.0, 0.0, 0])
+            totals[0] += record.wall
+            totals[1] += record.cpu
+            totals[2] = max(totals[2], record.alloc_bytes)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    megabytes = written / (1024 * 1024)
+    print(
+        f"{jobs + invalid} jobs, {images} images, {failures + invalid} failed in "
+        f"{elapsed:.2f}s ({images / elapsed:.2f} images/s, "
+        f"{megabytes / elapsed:.2f} MB/s written)"
+    )
+    if invalid:
+        print(f"{invalid} of them invalid jobs, not rendered")
+    if encoded:
+        print(
+            f"{encoded} encoded, {images - encoded} from cache, "
+            f"{encode_seconds / encoded * 1000:.1f} ms per encode"
+        )
+    if frames:
+        print(
+            f"{frames} animation frames, "
+            f"{frames / max(frame_seconds, 1e-9):.2f} frames/s per animation"
+        )
+    if peak_rss:
+        print(f"largest render peaked at {peak_rss / (1024 * 1024):.1f} MB RSS")
+    if stage_totals:
+        print(f"{'stage':10} {'wall s':>9} {'cpu s':>9} {'peak MB':>8}")
+        for stage, (wall, cpu, peak) in stage_totals.items():
+            print(f"{stage:10} {wall:9.2f} {cpu:9.2f} {peak / (1024 * 1024):8.1f}")
+    return failures + invalid
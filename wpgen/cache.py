@@ -0,0 +1,214 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from wpgen.resolutions import parse_resolutions
+
+# Config keys that only decide where or how a render runs, not what it looks like
+VOLATILE_KEYS = {
+    "output_dir",
+    "workers",
+    "cache",
+    "name",
+    "resolutions",
+    "memory_budget",
+    "instrument",
+    "threads",
+}
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Eviction frees the cache down to this share of max_bytes, so a full cache
+# is not rescanned on every store
+EVICT_TO = 0.9
+
+
+def cache_root():
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "wpgen"
+
+
+def default_cache_dir():
+    return cache_root() / "renders"
+
+
+_file_hashes = {}
+
+
+def file_hash(path):
+    """Returns the SHA-256 of a file's content, memoized by path, size and mtime."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = _file_hashes[memo_key] = h.hexdigest()
+    return digest
+
+
+def render_key(config, width, height, version):
+    """
+    Returns the content address of one rendered output: a hash of the
+    canonical config, the seed, the resolution, the logo file's content
+    and the generator's render version. With 'shared_base' every output
+    derives from a canvas covering the whole resolution set, so that
+    canvas is part of the key too. Returns None for unseeded configs,
+    whose output is random by design.
+    """
+    seed = config.get("seed", 42)
+    if seed is None:
+        return None
+
+    material = {k: v for k, v in config.items() if k not in VOLATILE_KEYS}
+    material["seed"] = seed
+    material["size"] = [width, height]
+    material["version"] = version
+    if config.get("shared_base") and config.get("mode") != "animated":
+        # Same as generator.covering_canvas
+        resolutions = parse_resolutions(config.get("resolutions"))
+        material["canvas"] = [
+            max(w for w, _ in resolutions),
+            max(h for _, h in resolutions),
+        ]
+    if material.get("logo_path"):
+        try:
+            material["logo_path"] = file_hash(material["logo_path"])
+        except OSError:
+            # An unreadable logo is skipped by the render, so it renders
+            # like any other unreadable logo
+            material["logo_path"] = "unreadable"
+
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def tmp_path(path):
+    """
+    Returns a temporary path beside path to write to before renaming it
+    into place; unique per process and thread, as workers and the
+    server's threads may write the same file at once.
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    """
+    Opens tmp_path(path) like open() and renames it onto path when the
+    block completes, so readers never see a partial file and an existing
+    file (possibly a hardlink into the render cache) is replaced rather
+    than overwritten in place. If the block raises, the temporary file is
+    removed instead.
+    """
+    tmp = tmp_path(path)
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _link_or_copy(src, dest):
+    """Atomically places src at dest as a hardlink, or as a copy across filesystems."""
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        # Already linked; renaming a link onto itself would leave tmp behind
+        return
+    tmp = tmp_path(dest)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+class RenderCache:
+    """
+    On-disk cache of rendered files, addressed by render_key and bounded
+    to max_bytes by evicting the least recently used entries.
+
+    The directory is only scanned on the first store and whenever the
+    running size total goes over max_bytes. Files other processes store
+    in between are counted at the next scan.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory or default_cache_dir())
+        self.max_bytes = max_bytes
+        # Size of the directory as of the last scan plus what was stored
+        # since; None until the first store
+        self._bytes = None
+
+    def _entry(self, key, suffix):
+        return self.directory / key[:2] / f"{key}{suffix}"
+
+    def fetch(self, key, dest):
+        """Places the cached file for key at dest. Returns False on a miss."""
+        entry = self._entry(key, Path(dest).suffix)
+        try:
+            # Touch for LRU ordering
+            os.utime(entry)
+            _link_or_copy(entry, dest)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, path):
+        """Adds the file at path under key, then evicts if over max_bytes."""
+        entry = self._entry(key, Path(path).suffix)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        added = 0 if entry.exists() else os.path.getsize(path)
+        _link_or_copy(path, entry)
+        if self._bytes is None or self._bytes + added > self.max_bytes:
+            self.evict()
+        else:
+            self._bytes += added
+
+    def evict(self):
+        """
+        Scans the directory and, if it holds more than max_bytes, evicts
+        down to EVICT_TO of it.
+        """
+        entries = []
+        total = 0
+        for sub in self.directory.iterdir():
+            if not sub.is_dir():
+                continue
+            for entry in sub.iterdir():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted concurrently by another worker
+                entries.append((stat.st_mtime_ns, stat.st_size, entry))
+                total += stat.st_size
+
+        entries.sort()
+        target = self.max_bytes * EVICT_TO if total > self.max_bytes else total
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
+
+
+# Global instance
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = RenderCache()
+    return _cache
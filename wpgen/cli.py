@@ -0,0 +1,333 @@
+import argparse
+import sys
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="wpgen",
+        description="Wallpaper generator. Starts the TUI when run without a command.",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    batch = commands.add_parser(
+        "batch", help="render every config of a JSONL/TOML manifest headlessly"
+    )
+    batch.add_argument("manifest", help="path to a .jsonl or .toml manifest")
+    batch.add_argument(
+        "-o",
+        "--output-dir",
+        default=".",
+        help="directory receiving one sub-directory per job (default: .)",
+    )
+    batch.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: CPU count)",
+    )
+    batch.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="threads running each render's effects chain in bands (default: 1)",
+    )
+    batch.add_argument(
+        "--format",
+        choices=["png", "webp", "jpeg", "qoi", "raw"],
+        help="output format for jobs that do not set one (default: png)",
+    )
+    batch.add_argument(
+        "--preset",
+        choices=["fast", "balanced", "smallest"],
+        help="encoder preset for jobs that do not set one (default: balanced)",
+    )
+    batch.add_argument(
+        "--resolutions",
+        help='resolution set for jobs that do not set one, e.g. "3840x2160,5120x1440"',
+    )
+    batch.add_argument(
+        "--tile-rows",
+        type=int,
+        help="render jobs that do not set tile_rows in strips of that many rows",
+    )
+    batch.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream PNG jobs strip by strip into their files (lowest memory)",
+    )
+    batch.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="run every stage of jobs in place on one frame buffer",
+    )
+    batch.add_argument(
+        "--memory-budget",
+        help='peak RSS the running renders may add up to, e.g. "4G"',
+    )
+    batch.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every pipeline stage and print per-stage totals",
+    )
+    batch.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="always render, ignoring and not filling the render cache",
+    )
+
+    serve = commands.add_parser(
+        "serve", help="keep a warm renderer listening for requests on a Unix socket"
+    )
+    serve.add_argument(
+        "--socket", help="socket path (default: $XDG_RUNTIME_DIR/wpgen.sock)"
+    )
+    serve.add_argument(
+        "-j",
+        "--threads",
+        type=int,
+        default=None,
+        help="number of render threads (default: CPU count)",
+    )
+    serve.add_argument(
+        "--queue",
+        type=int,
+        default=16,
+        help="requests that may wait for a thread before new ones are refused",
+    )
+
+    render = commands.add_parser(
+        "render", help="render a JSON config on a running 'wpgen serve'"
+    )
+    render.add_argument("config", help="path to a JSON config, or - for stdin")
+    render.add_argument("--socket", help="socket path of the server")
+    render.add_argument(
+        "--timeout", type=float, default=None, help="seconds to wait for the render"
+    )
+
+    palette = commands.add_parser(
+        "palette", help="print the dominant colours of an image, most common first"
+    )
+    palette.add_argument("image", help="photo or wallpaper to take the colours from")
+    palette.add_argument(
+        "-n", "--colors", type=int, default=3, help="number of colours (default: 3)"
+    )
+
+    pack = commands.add_parser(
+        "pack", help="render every solid, gradient and mesh a set of colours makes"
+    )
+    pack.add_argument("output_dir", help="pack directory; an interrupted pack resumes")
+    pack.add_argument(
+        "--colors", help='comma-separated colours (default: the Kitchn theme\'s)'
+    )
+    pack.add_argument(
+        "--modes",
+        default="solid,linear,mesh",
+        help="subset of solid, linear, mesh (default: all)",
+    )
+    pack.add_argument(
+        "--mesh-sizes",
+        default="small,medium,large",
+        help="mesh blob sizes to render (default: all)",
+    )
+    pack.add_argument(
+        "--resolutions",
+        help='resolution set of every job, e.g. "3840x2160" (default: all presets)',
+    )
+    pack.add_argument(
+        "--noise", type=float, default=None, help="grain intensity of every job"
+    )
+    pack.add_argument(
+        "--format",
+        choices=["png", "webp", "jpeg", "qoi", "raw"],
+        help="output format (default: png)",
+    )
+    pack.add_argument(
+        "--preset",
+        choices=["fast", "balanced", "smallest"],
+        help="encoder preset (default: balanced)",
+    )
+    pack.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: CPU count)",
+    )
+    pack.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="run every stage in place on one frame buffer",
+    )
+    pack.add_argument(
+        "--memory-budget",
+        help='peak RSS the running renders may add up to, e.g. "4G"',
+    )
+    pack.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the number of jobs and exit",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Entry point for pipx installation"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        from wpgen.batch import run_batch
+        from wpgen.parallel import parse_size
+        from wpgen.resolutions import parse_resolutions
+
+        defaults = {}
+        budget = None
+        try:
+            if args.resolutions:
+                defaults["resolutions"] = parse_resolutions(args.resolutions)
+            if args.memory_budget:
+                budget = parse_size(args.memory_budget)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.low_memory:
+            defaults["low_memory"] = True
+        if args.tile_rows:
+            defaults["tile_rows"] = args.tile_rows
+        if args.stream:
+            defaults["stream"] = True
+        if args.threads:
+            defaults["threads"] = args.threads
+        if args.format:
+            defaults["format"] = args.format
+        if args.preset:
+            defaults["preset"] = args.preset
+        try:
+            failures = run_batch(
+                args.manifest,
+                args.output_dir,
+                args.workers,
+                args.cache,
+                defaults,
+                args.profile,
+                budget,
+            )
+        except (OSError, ValueError) as e:
+            print(f"wpgen batch: {e}", file=sys.stderr)
+            return 1
+        return 1 if failures else 0
+
+    if args.command == "serve":
+        from wpgen.serve import serve
+
+        try:
+            serve(args.socket, args.threads, args.queue)
+        except (OSError, RuntimeError) as e:
+            print(f"wpgen serve: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "render":
+        import json
+
+        from wpgen import client
+
+        try:
+            if args.config == "-":
+                config = json.load(sys.stdin)
+            else:
+                with open(args.config, encoding="utf-8") as f:
+                    config = json.load(f)
+            response = client.render(config, args.socket, args.timeout)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"wpgen render: {e}", file=sys.stderr)
+            return 1
+        for path in response["paths"]:
+            print(path)
+        return 0
+
+    if args.command == "palette":
+        from wpgen.palette import extract_palette
+
+        try:
+            result = extract_palette(args.image, max(1, args.colors))
+        except (OSError, ValueError) as e:
+            print(f"wpgen palette: {e}", file=sys.stderr)
+            return 1
+        for color in result.colors:
+            print(color)
+        source = "cached" if result.cached else "extracted"
+        print(f"{source} in {result.seconds * 1000:.1f} ms", file=sys.stderr)
+        return 0
+
+    if args.command == "pack":
+        from wpgen import packs
+        from wpgen.parallel import parse_size
+        from wpgen.resolutions import parse_resolutions
+        from wpgen.theme import theme_colors
+
+        if args.colors:
+            colors = args.colors.split(",")
+        else:
+            colors = theme_colors()
+            if not colors:
+                parser.error("no Kitchn theme found; pass --colors")
+        modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+        mesh_sizes = [m.strip() for m in args.mesh_sizes.split(",") if m.strip()]
+        for option, values, choices in (
+            ("--modes", modes, packs.MODES),
+            ("--mesh-sizes", mesh_sizes, packs.MESH_SIZES),
+        ):
+            if not set(values) <= set(choices):
+                parser.error(f"{option} must be a subset of {', '.join(choices)}")
+
+        defaults = {}
+        budget = None
+        try:
+            colors = packs.normalize_colors(colors)
+            if args.resolutions:
+                defaults["resolutions"] = parse_resolutions(args.resolutions)
+            if args.memory_budget:
+                budget = parse_size(args.memory_budget)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.noise is not None:
+            defaults["noise"] = args.noise
+        if args.format:
+            defaults["format"] = args.format
+        if args.preset:
+            defaults["preset"] = args.preset
+
+        if args.dry_run:
+            total = packs.pack_size(len(colors), modes, packs.DIRECTIONS, mesh_sizes)
+            print(f"{total} jobs from {len(colors)} colours")
+            return 0
+        try:
+            failures = packs.run_pack(
+                colors,
+                args.output_dir,
+                defaults,
+                modes,
+                packs.DIRECTIONS,
+                mesh_sizes,
+                args.workers,
+                budget,
+                args.low_memory,
+            )
+        except ValueError as e:
+            print(f"wpgen pack: {e}", file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            print("wpgen pack: interrupted; run it again to resume", file=sys.stderr)
+            return 130
+        return 1 if failures else 0
+
+    from wpgen import tui
+
+    tui.main()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
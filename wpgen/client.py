@@ -0,0 +1,66 @@
+"""
+Client side of the render server (see wpgen.serve).
+
+Only uses the standard library, so scripts and theme hooks that hand their
+renders to a running 'wpgen serve' start without importing PIL or NumPy.
+"""
+
+import json
+import os
+import socket
+
+
+def default_socket_path():
+    """$WPGEN_SOCKET, else wpgen.sock in $XDG_RUNTIME_DIR or /tmp."""
+    path = os.environ.get("WPGEN_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "wpgen.sock")
+    return os.path.join("/tmp", f"wpgen-{os.getuid()}.sock")
+
+
+def call(message, path=None, timeout=None):
+    """
+    Sends one request object to the server and returns its response.
+    Raises OSError (e.g. FileNotFoundError, ConnectionRefusedError) if no
+    server listens at path.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket_path())
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("The server closed the connection without answering")
+    return json.loads(line)
+
+
+def render(config, path=None, timeout=None):
+    """
+    Renders a generate_wallpaper config on the server and returns its
+    response: 'paths' lists the written files, 'seconds' the render time,
+    'queued' the time spent waiting for a worker and 'results' the paths
+    and encode time per render task. Raises RuntimeError if the render
+    failed or the server is busy.
+
+    The server resolves no paths against its own working directory, so
+    output_dir (default: the current directory) is made absolute here.
+    """
+    output_dir = os.path.abspath(config.get("output_dir") or os.getcwd())
+    config = dict(config, output_dir=output_dir)
+    response = call({"config": config}, path, timeout)
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error", "Render failed"))
+    return response
+
+
+def ping(path=None, timeout=5.0):
+    """Returns the server's status, or None if no server is running."""
+    try:
+        return call({"op": "ping"}, path, timeout)
+    except OSError:
+        return None
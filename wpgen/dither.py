@@ -0,0 +1,163 @@
+"""
+Blue-noise dithering of smooth backgrounds (config 'dither').
+
+Gradients and meshes are computed at more than 8 bits, but stored at 8:
+a slow ramp across a 4K screen turns into visible bands a few dozen pixels
+wide. Dithering rounds every pixel up or down depending on a threshold
+that varies across the image. The fraction of pixels rounded up then
+follows the exact value, so the bands dissolve into noise too fine and too
+faint (under one level) to see.
+
+The thresholds come from a DITHER_TILE x DITHER_TILE blue-noise texture:
+the ranks 0..N-1 of a void-and-cluster pattern (Ulichney, 1993), in which
+every threshold level is spread as evenly as possible and neighbouring
+pixels never share a level. Unlike white noise, it has no low-frequency
+clumps, and it tiles without seams. The texture is generated once and kept
+in memory and on disk (~/.cache/wpgen/dither).
+
+Values are held in 8.8 fixed point (value * 256 as uint16), so quantizing
+is one in-place integer add of the tiled thresholds and a shift, with no
+per-pixel error diffusion.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from wpgen.cache import atomic_write, cache_root
+
+DITHER_TILE = 64
+
+# Width of the Gaussian the void-and-cluster energy is measured with
+SIGMA = 1.5
+
+# Largest 8.8 value: 255.0, which no threshold can push past 255
+FIXED_MAX = 255 * 256
+
+_textures = {}
+_lock = threading.Lock()
+
+
+def default_dither_dir():
+    return cache_root() / "dither"
+
+
+def _generate(size):
+    rng = np.random.default_rng(0)
+    count = size * size
+
+    # Toroidal Gaussian centred on (0, 0); rolled onto a pixel, it is that
+    # pixel's contribution to the energy of every other pixel
+    d = np.minimum(np.arange(size), size - np.arange(size)).astype(np.float64)
+    r2 = d[:, np.newaxis] ** 2 + d[np.newaxis, :] ** 2
+    kernel = np.exp(-r2 / (2 * SIGMA**2))
+
+    def splat(energy, index, sign):
+        energy += sign * np.roll(kernel, divmod(index, size), axis=(0, 1))
+
+    pattern = np.zeros(count, dtype=bool)
+    pattern[rng.choice(count, count // 10, replace=False)] = True
+    spectrum = np.fft.rfft2(pattern.reshape(size, size)) * np.fft.rfft2(kernel)
+    energy = np.fft.irfft2(spectrum, s=kernel.shape)
+    flat = energy.reshape(-1)
+
+    # Move the tightest cluster into the largest void until that is a no-op
+    while True:
+        cluster = np.argmax(np.where(pattern, flat, -np.inf))
+        pattern[cluster] = False
+        splat(energy, cluster, -1)
+        void = np.argmin(np.where(pattern, np.inf, flat))
+        pattern[void] = True
+        splat(energy, void, 1)
+        if void == cluster:
+            break
+
+    ranks = np.empty(count, dtype=np.uint16)
+    ones = int(pattern.sum())
+
+    # Ranks below the initial pattern: take away the tightest clusters
+    removing, removing_energy = pattern.copy(), energy.copy()
+    removing_flat = removing_energy.reshape(-1)
+    for rank in range(ones - 1, -1, -1):
+        cluster = np.argmax(np.where(removing, removing_flat, -np.inf))
+        removing[cluster] = False
+        splat(removing_energy, cluster, -1)
+        ranks[cluster] = rank
+
+    # Ranks above it: fill the largest voids
+    for rank in range(ones, count):
+        void = np.argmin(np.where(pattern, np.inf, flat))
+        pattern[void] = True
+        splat(energy, void, 1)
+        ranks[void] = rank
+    return ranks.reshape(size, size)
+
+
+def blue_noise(size=DITHER_TILE, directory=None):
+    """
+    Returns the read-only (size, size) uint8 threshold texture: blue-noise
+    ranks scaled to 0..255, each level on size * size / 256 pixels. It is
+    generated once (0.2 s for the default size) and cached in memory and
+    in directory (default: default_dither_dir()).
+    """
+    with _lock:
+        texture = _textures.get(size)
+    if texture is not None:
+        return texture
+
+    directory = directory or default_dither_dir()
+    path = os.path.join(directory, f"blue_{size}.npy")
+    try:
+        texture = np.load(path)
+        if texture.shape != (size, size) or texture.dtype != np.uint8:
+            raise ValueError("not a dither texture")
+    except (OSError, ValueError):
+        ranks = _generate(size).astype(np.uint32)
+        texture = (ranks * 256 // (size * size)).astype(np.uint8)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with atomic_write(path) as f:
+                np.save(f, texture)
+        except OSError:
+            # A read-only cache only costs generating the texture again
+            pass
+
+    texture.flags.writeable = False
+    with _lock:
+        _textures[size] = texture
+    return texture
+
+
+def to_fixed(values):
+    """Returns float values in 0..255 as 8.8 fixed point uint16."""
+    fixed = np.multiply(values, np.float32(256), dtype=np.float32)
+    np.clip(fixed, 0, FIXED_MAX, out=fixed)
+    return fixed.astype(np.uint16)
+
+
+def quantize(fixed, row_offset=0, texture=None):
+    """
+    Dithers fixed, a (height, width) or (height, width, channels) array of
+    8.8 fixed-point values, to 8 bits and returns the uint8 result. fixed
+    is overwritten. row_offset is the frame row fixed starts at, so strips
+    of a frame line up with the texture as the whole frame would. All
+    channels share the thresholds, which keeps the noise free of colour.
+    """
+    texture = blue_noise() if texture is None else texture
+    height, width = fixed.shape[:2]
+    size = texture.shape[0]
+    # One texture-high band of thresholds, tiled across the width
+    reps = -(-width // size)
+    band = np.tile(texture, (1, reps))[:, :width].astype(np.uint16)
+    if fixed.ndim == 3:
+        band = band[:, :, np.newaxis]
+
+    y = 0
+    while y < height:
+        ty = (row_offset + y) % size
+        rows = min(height - y, size - ty)
+        fixed[y : y + rows] += band[ty : ty + rows]
+        y += rows
+    fixed >>= 8
+    return fixed.astype(np.uint8)
@@ -0,0 +1,190 @@
+import os
+import time
+import zlib
+from typing import NamedTuple
+
+from PIL import Image
+
+from wpgen.cache import atomic_write
+
+# Output format -> (file extension, PIL format name)
+FORMATS = {
+    "png": (".png", "PNG"),
+    "webp": (".webp", "WEBP"),
+    "jpeg": (".jpg", "JPEG"),
+    "qoi": (".qoi", "QOI"),
+    # Uncompressed binary PPM for local pipelines
+    "raw": (".ppm", "PPM"),
+}
+
+# Animation output format -> (path suffix, PIL format name, preset format).
+# "frames" writes a directory of numbered PNG frames.
+ANIMATION_FORMATS = {
+    "webp": (".webp", "WEBP", "webp"),
+    "apng": (".png", "PNG", "png"),
+    "frames": ("_frames", None, "png"),
+}
+
+# Per-format PIL save settings of the named presets. "balanced" PNG is
+# PIL's default, so it produces the same files as a plain img.save().
+PRESETS = {
+    "png": {
+        # Run-length matching is faster and, on smooth frames, smaller
+        # than the default deflate strategy
+        "fast": {"compress_level": 1, "compress_type": zlib.Z_RLE},
+        "balanced": {"compress_level": 6},
+        "smallest": {"compress_level": 9, "optimize": True},
+    },
+    "webp": {
+        "fast": {"lossless": True, "method": 0, "quality": 0},
+        "balanced": {"lossless": True, "method": 4, "quality": 50},
+        "smallest": {"lossless": True, "method": 6, "quality": 100},
+    },
+    "jpeg": {
+        "fast": {"quality": 85, "subsampling": "4:2:0"},
+        "balanced": {"quality": 92, "subsampling": "4:4:4", "optimize": True},
+        "smallest": {
+            "quality": 80,
+            "subsampling": "4:2:0",
+            "optimize": True,
+            "progressive": True,
+        },
+    },
+    "qoi": {"fast": {}, "balanced": {}, "smallest": {}},
+    "raw": {"fast": {}, "balanced": {}, "smallest": {}},
+}
+
+
+# Animated WebP presets are lossy: lossless frames of grainy gradients
+# take minutes to encode and hundreds of MB per loop. APNG uses the PNG
+# presets.
+ANIMATION_PRESETS = {
+    "webp": {
+        "fast": {"lossless": False, "method": 0, "quality": 80},
+        "balanced": {"lossless": False, "method": 4, "quality": 85},
+        "smallest": {"lossless": False, "method": 6, "quality": 75},
+    },
+    "png": PRESETS["png"],
+}
+
+
+class EncodeResult(NamedTuple):
+    path: str
+    format: str
+    seconds: float
+    bytes: int
+
+
+def extension(fmt):
+    try:
+        return FORMATS[fmt][0]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {fmt}") from None
+
+
+def animation_extension(fmt):
+    try:
+        return ANIMATION_FORMATS[fmt][0]
+    except KeyError:
+        raise ValueError(f"Unknown animation format: {fmt}") from None
+
+
+def supported(fmt):
+    """Returns whether the installed Pillow can write fmt (QOI needs Pillow 11.3+)."""
+    Image.init()
+    return FORMATS[fmt][1] in Image.SAVE
+
+
+def encoder_settings(fmt="png", preset="balanced", options=None):
+    """
+    Returns the PIL save settings for a format and preset. options
+    overrides individual settings, e.g. {"lossless": False, "quality": 85}
+    turns WebP lossy.
+    """
+    extension(fmt)
+    try:
+        settings = dict(PRESETS[fmt][preset])
+    except KeyError:
+        raise ValueError(f"Unknown preset: {preset}") from None
+    settings.update(options or {})
+    return settings
+
+
+def png_stream_settings(preset="balanced", options=None):
+    """
+    Maps the PNG settings of a preset (plus options) onto PNGStreamWriter
+    arguments. optimize has no streaming equivalent beyond level 9.
+    """
+    settings = encoder_settings("png", preset, options)
+    level = 9 if settings.get("optimize") else settings.get("compress_level", 6)
+    return {
+        "level": level,
+        "strategy": settings.get("compress_type", zlib.Z_DEFAULT_STRATEGY),
+        "filter_type": settings.get("filter", "adaptive"),
+    }
+
+
+def encode(img, path, fmt="png", preset="balanced", options=None):
+    """
+    Encodes img to path and returns what it cost as an EncodeResult.
+
+    The file is written with cache.atomic_write, so an existing file
+    (possibly a hardlink into the render cache) is replaced rather than
+    overwritten in place.
+    """
+    settings = encoder_settings(fmt, preset, options)
+    start = time.perf_counter()
+    with atomic_write(path) as f:
+        img.save(f, format=FORMATS[fmt][1], **settings)
+    seconds = time.perf_counter() - start
+    return EncodeResult(path, fmt, seconds, os.path.getsize(path))
+
+
+def encode_animation(
+    frames, path, fmt="webp", preset="balanced", options=None, duration=33, loop=0
+):
+    """
+    Encodes a list of frames as one looping animated WebP or APNG file and
+    returns an EncodeResult. duration is the display time of every frame
+    in milliseconds; loop=0 repeats forever. Presets come from
+    ANIMATION_PRESETS; options overrides individual settings.
+    """
+    _, pil_format, still_format = ANIMATION_FORMATS[fmt]
+    if pil_format is None:
+        raise ValueError(f"{fmt} is not a single-file animation format")
+    try:
+        settings = dict(ANIMATION_PRESETS[still_format][preset])
+    except KeyError:
+        raise ValueError(f"Unknown preset: {preset}") from None
+    settings.update(options or {})
+    start = time.perf_counter()
+    with atomic_write(path) as f:
+        frames[0].save(
+            f,
+            format=pil_format,
+            save_all=True,
+            append_images=frames[1:],
+            duration=duration,
+            loop=loop,
+            **settings,
+        )
+    seconds = time.perf_counter() - start
+    return EncodeResult(path, fmt, seconds, os.path.getsize(path))
+
+
+def encode_stream(strips, path, width, height, preset="balanced", options=None):
+    """
+    Streams an RGB image given as an iterable of top-to-bottom row strips
+    (uint8 arrays or PIL images) into a PNG at path and returns an
+    EncodeResult. Only a few strips are held at a time. seconds is the CPU
+    time the background encoder spent filtering and compressing, which
+    overlaps with producing the strips.
+    """
+    from wpgen.pngstream import PNGStreamWriter
+
+    settings = png_stream_settings(preset, options)
+    with atomic_write(path) as f:
+        with PNGStreamWriter(f, width, height, **settings) as writer:
+            for strip in strips:
+                writer.write(strip)
+    return EncodeResult(path, "png", writer.seconds, os.path.getsize(path))
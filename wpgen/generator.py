@@ -1,8 +1,19 @@
 import random
 import os
+from typing import NamedTuple, Optional
 from PIL import Image, ImageDraw, ImageFilter, ImageEnhance
 import numpy as np
 
+from wpgen import dither, encoders, grain, ramps
+from wpgen.cache import get_cache, render_key
+from wpgen.instrument import PeakWindow, Recorder, span
+from wpgen.logos import get_logo_cache
+from wpgen.resolutions import (  # noqa: F401 (re-exported)
+    MAX_DIMENSION,
+    RESOLUTIONS,
+    parse_resolutions,
+)
+
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip("#")
@@ -13,61 +24,124 @@ def create_solid_background(width, height, color):
     return Image.new("RGB", (width, height), hex_to_rgb(color))
 
 
-def create_linear_gradient(width, height, start_color, end_color, direction="vertical"):
-    base = Image.new("RGB", (width, height), hex_to_rgb(start_color))
-    top = Image.new("RGB", (width, height), hex_to_rgb(end_color))
-    mask = Image.new("L", (width, height))
-    mask_data = []
+def gradient_progress(width, height, direction="vertical", rows=None):
+    """
+    Returns the per-pixel blend progress (0.0 to 1.0) of a linear gradient
+    as a float64 array of shape (height, width).
+
+    Every direction is evaluated as broadcast array math on a row and a
+    column ramp, so no Python-level loop touches individual pixels.
+    rows=(top, bottom) restricts the result to that row range of the
+    full-size gradient.
+    """
+    top, bottom = rows or (0, height)
+    xs = np.arange(width, dtype=np.float64)
+    ys = np.arange(top, bottom, dtype=np.float64)
+    shape = (bottom - top, width)
 
-    if direction == "vertical":
-        # Top to bottom
-        for y in range(height):
-            mask_data.extend([int(255 * (y / height))] * width)
-    elif direction == "horizontal":
+    if direction == "horizontal":
         # Left to right
-        for y in range(height):
-            row = [int(255 * (x / width)) for x in range(width)]
-            mask_data.extend(row)
+        return np.broadcast_to(xs / width, shape)
     elif direction == "diagonal_tl_br":
-        # Top-left to bottom-right
-        for y in range(height):
-            row = []
-            for x in range(width):
-                # Distance along diagonal (0 to 1)
-                progress = (x / width + y / height) / 2
-                row.append(int(255 * progress))
-            mask_data.extend(row)
+        # Top-left to bottom-right: distance along diagonal (0 to 1)
+        return (xs[np.newaxis, :] / width + ys[:, np.newaxis] / height) / 2
     elif direction == "diagonal_tr_bl":
         # Top-right to bottom-left
-        for y in range(height):
-            row = []
-            for x in range(width):
-                progress = ((width - x) / width + y / height) / 2
-                row.append(int(255 * progress))
-            mask_data.extend(row)
+        return ((width - xs)[np.newaxis, :] / width + ys[:, np.newaxis] / height) / 2
     elif direction == "radial":
         # Radial from center
         center_x, center_y = width // 2, height // 2
         max_dist = ((width / 2) ** 2 + (height / 2) ** 2) ** 0.5
-        for y in range(height):
-            row = []
-            for x in range(width):
-                dist = ((x - center_x) ** 2 + (y - center_y) ** 2) ** 0.5
-                progress = min(dist / max_dist, 1.0)
-                row.append(int(255 * progress))
-            mask_data.extend(row)
+        dx2 = (xs - center_x) ** 2
+        dy2 = (ys - center_y) ** 2
+        dist = np.sqrt(dy2[:, np.newaxis] + dx2[np.newaxis, :])
+        return np.minimum(dist / max_dist, 1.0)
     else:
-        # Default to vertical
-        for y in range(height):
-            mask_data.extend([int(255 * (y / height))] * width)
+        # Vertical (top to bottom) is also the fallback
+        return np.broadcast_to((ys / height)[:, np.newaxis], shape)
 
-    mask.putdata(mask_data)
-    base.paste(top, (0, 0), mask)
+
+def gradient_mask(width, height, direction="vertical", rows=None):
+    """Returns the 8-bit blend mask of a linear gradient as an 'L' image."""
+    mask = (255 * gradient_progress(width, height, direction, rows)).astype(np.uint8)
+    return Image.fromarray(mask, "L")
+
+
+def create_linear_gradient(
+    width, height, start_color, end_color, direction="vertical", rows=None
+):
+    """
+    Blends start_color into end_color along direction. With rows=(top,
+    bottom) only that strip of the full-size gradient is rendered.
+    """
+    top, bottom = rows or (0, height)
+    size = (width, bottom - top)
+    base = Image.new("RGB", size, hex_to_rgb(start_color))
+    end = Image.new("RGB", size, hex_to_rgb(end_color))
+    mask = gradient_mask(width, height, direction, rows)
+    base.paste(end, (0, 0), mask)
     return base
 
 
+def create_ramp_gradient(width, height, ramp, direction="vertical", rows=None):
+    """
+    Maps the progress of a linear gradient along direction through ramp, a
+    wpgen.ramps lookup table; a fixed-point table is dithered to 8 bits.
+    With rows=(top, bottom) only that strip of the full-size gradient is
+    rendered.
+    """
+    progress = gradient_progress(width, height, direction, rows)
+    return ramp_image(progress, ramp, rows[0] if rows else 0)
+
+
+def ramp_image(progress, ramp, row_offset=0):
+    """
+    Returns the RGB image of progress mapped through ramp. Fixed-point
+    ramps are dithered, with progress starting at frame row row_offset.
+    """
+    pixels = ramps.apply_ramp(progress, ramp)
+    if pixels.dtype != np.uint8:
+        pixels = dither.quantize(pixels, row_offset)
+    return Image.fromarray(pixels, "RGB")
+
+
+def gradient_ramp(config):
+    """
+    Returns the lookup table of a multi-stop or dithered gradient config,
+    or None for a plain two-colour sRGB blend, which the mask blend
+    renders. Raises ValueError for invalid 'gradient_stops' or
+    'gradient_interpolation'.
+    """
+    colors = config.get("colors", ["#000000"])
+    stops = config.get("gradient_stops")
+    interpolation = config.get("gradient_interpolation", "srgb")
+    fixed = bool(config.get("dither"))
+    if len(colors) <= 2 and stops is None and interpolation == "srgb" and not fixed:
+        return None
+    rgb = [hex_to_rgb(c) for c in colors]
+    return ramps.color_ramp(rgb, stops, interpolation, fixed=fixed)
+
+
+def linear_gradient(width, height, config, rows=None):
+    """Renders the linear gradient of config, or rows=(top, bottom) of it."""
+    direction = config.get("gradient_direction", "vertical")
+    ramp = gradient_ramp(config)
+    if ramp is not None:
+        return create_ramp_gradient(width, height, ramp, direction, rows)
+    colors = config.get("colors", ["#000000"])
+    c1 = colors[0]
+    c2 = colors[1] if len(colors) > 1 else colors[0]
+    return create_linear_gradient(width, height, c1, c2, direction, rows)
+
+
 def create_mesh_gradient(
-    width, height, colors, blob_count=None, blur_intensity=1.0, blob_size="medium"
+    width,
+    height,
+    colors,
+    blob_count=None,
+    blur_intensity=1.0,
+    blob_size="medium",
+    rng=None,
 ):
     """
     Creates a trendy mesh/aurora gradient by placing large blurred orbs.
@@ -78,9 +152,32 @@ def create_mesh_gradient(
         blob_count: Number of blobs (default: len(colors) * 2)
         blur_intensity: Blur strength 0.1-2.0 (default: 1.0)
         blob_size: 'small', 'medium', 'large' (default: 'medium')
+        rng: random.Random used for blob placement (default: global random)
+    """
+    small_img = mesh_canvas(
+        width, height, colors, blob_count, blur_intensity, blob_size, rng
+    )
+    return upscale_mesh(small_img, width, height)
+
+
+def mesh_canvas(
+    width,
+    height,
+    colors,
+    blob_count=None,
+    blur_intensity=1.0,
+    blob_size="medium",
+    rng=None,
+    precise=False,
+):
+    """
+    Draws and blurs the reduced-size canvas of a mesh gradient. Arguments
+    are those of create_mesh_gradient; upscale_mesh turns the canvas into
+    the final image. With precise the blur runs in floating point and the
+    canvas is returned as float32 planes for upscale_mesh_dithered.
     """
+    rng = rng or random
     base_color = hex_to_rgb(colors[0])
-    img = Image.new("RGB", (width, height), base_color)
 
     # We need a robust blur, so we draw on a smaller canvas and upscale for speed + smoothness
     # Increased scale_factor from 0.1 to 0.3 for better quality
@@ -107,34 +204,218 @@ def create_mesh_gradient(
     for i in range(blob_count):
         color = rgb_colors[i % len(rgb_colors)]
         # Random position (can be off-screen for edge blobs)
-        x = random.randint(-small_w // 2, small_w + small_w // 2)
-        y = random.randint(-small_h // 2, small_h + small_h // 2)
+        x = rng.randint(-small_w // 2, small_w + small_w // 2)
+        y = rng.randint(-small_h // 2, small_h + small_h // 2)
         # Random size
-        radius = random.randint(min_radius, max_radius)
+        radius = rng.randint(min_radius, max_radius)
 
         small_draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
 
     # Apply blur with configurable intensity
     blur_radius = int((small_w // 4) * blur_intensity)
     blur_radius = max(1, blur_radius)  # Ensure at least 1
-    small_img = small_img.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+    if precise:
+        planes = np.asarray(small_img, dtype=np.float32).transpose(2, 0, 1).copy()
+        return gaussian_blur_planes(planes, blur_radius)
+    return small_img.filter(ImageFilter.GaussianBlur(radius=blur_radius))
 
-    # Resize back up
-    img = small_img.resize((width, height), Image.Resampling.BICUBIC)
-    return img
+
+def gaussian_blur_planes(planes, sigma):
+    """
+    Blurs float32 planes of shape (channels, height, width) in place the
+    way ImageFilter.GaussianBlur blurs 8-bit images: three box blurs per
+    axis with the Gaussian's variance, edges extended. Returns planes.
+    """
+    from scipy.ndimage import uniform_filter1d
+
+    # Three boxes of width w add up to a variance of 3 * (w^2 - 1) / 12
+    size = max(1, round((4 * sigma * sigma + 1) ** 0.5)) | 1
+    for plane in planes:
+        for axis in (0, 1):
+            for _ in range(3):
+                uniform_filter1d(plane, size, axis, plane, mode="nearest")
+    return planes
+
+
+def upscale_mesh(small_img, width, height, rows=None):
+    """
+    Resizes a mesh canvas up to width x height. With rows=(top, bottom)
+    only that strip is produced; the resampling box maps it onto the same
+    source area, so strips line up with the full-size result.
+    """
+    if rows is None:
+        return small_img.resize((width, height), Image.Resampling.BICUBIC)
+    top, bottom = rows
+    small_w, small_h = small_img.size
+    box = (0, top * small_h / height, small_w, bottom * small_h / height)
+    return small_img.resize((width, bottom - top), Image.Resampling.BICUBIC, box=box)
+
+
+def upscale_mesh_dithered(planes, width, height, rows=None):
+    """
+    upscale_mesh for the float32 planes of a precise mesh canvas: resizes
+    each plane in floating point and dithers the result to 8 bits (see
+    wpgen.dither).
+    """
+    top, bottom = rows or (0, height)
+    small_h, small_w = planes.shape[1:]
+    box = (0, top * small_h / height, small_w, bottom * small_h / height)
+    fixed = np.empty((bottom - top, width, 3), dtype=np.uint16)
+    for channel, plane in enumerate(planes):
+        resized = Image.fromarray(plane, "F").resize(
+            (width, bottom - top), Image.Resampling.BICUBIC, box=box
+        )
+        fixed[..., channel] = dither.to_fixed(np.asarray(resized))
+    return Image.fromarray(dither.quantize(fixed, top), "RGB")
+
+
+# Blob radius ranges of the field mesh engine, in image widths. They match
+# the ranges of create_mesh_gradient relative to its canvas width.
+FIELD_SIZE_RANGES = {
+    "small": (1 / 6, 1 / 2),
+    "medium": (1 / 3, 1.0),
+    "large": (1 / 2, 1.5),
+}
+
+# Field canvases are evaluated at this fraction of the output size (but at
+# least FIELD_MIN_WIDTH wide); the fields are smooth enough for the bicubic
+# upscale to stay within 1-2 levels of a full-resolution evaluation
+FIELD_SCALE = 1 / 8
+FIELD_MIN_WIDTH = 64
+
+
+def mesh_field_blobs(colors, blob_count=None, blob_size="medium", rng=None):
+    """
+    Places the blobs of a field mesh gradient. Returns a list of
+    (x, y, radius, rgb) tuples with x in image widths, y in image heights
+    and radius in image widths, so the same blobs describe the same
+    composition at every resolution.
+    """
+    rng = rng or random
+    rgb_colors = [hex_to_rgb(c) for c in colors]
+
+    # Blob count: default to 2x color count for nice coverage
+    if blob_count is None:
+        blob_count = len(rgb_colors) * 2
+    min_radius, max_radius = FIELD_SIZE_RANGES.get(
+        blob_size, FIELD_SIZE_RANGES["medium"]
+    )
+
+    blobs = []
+    for i in range(blob_count):
+        # Random position (can be off-screen for edge blobs)
+        x = rng.uniform(-0.5, 1.5)
+        y = rng.uniform(-0.5, 1.5)
+        radius = rng.uniform(min_radius, max_radius)
+        blobs.append((x, y, radius, rgb_colors[i % len(rgb_colors)]))
+    return blobs
 
 
-def apply_noise(image, intensity=0.05):
+def render_mesh_field(
+    width, height, base_color, blobs, blur_intensity=1.0, precise=False
+):
+    """
+    Evaluates blobs from mesh_field_blobs at width x height and returns the
+    image, or with precise the float32 planes for upscale_mesh_dithered.
+    Every blob is a disc whose edge falls off smoothly (a logistic curve
+    about as wide as the blur of create_mesh_gradient at the same
+    blur_intensity), laid over base_color and the blobs before it.
+    """
+    xs = (np.arange(width, dtype=np.float32) + 0.5) / width
+    # Vertical offsets are measured in widths too, keeping blobs round
+    ys = (np.arange(height, dtype=np.float32) + 0.5) / width
+    planes = np.empty((3, height, width), dtype=np.float32)
+    for channel in range(3):
+        planes[channel] = base_color[channel]
+
+    # Logistic scale approximating a Gaussian edge of sigma width / 4
+    edge = np.float32(max(0.01, 0.25 * blur_intensity) * 0.55)
+    for x, y, radius, color in blobs:
+        dx2 = (xs - np.float32(x)) ** 2
+        dy2 = (ys - np.float32(y * height / width)) ** 2
+        alpha = np.sqrt(dy2[:, np.newaxis] + dx2[np.newaxis, :])
+        alpha -= np.float32(radius)
+        alpha /= edge
+        np.exp(alpha, out=alpha)
+        alpha += 1
+        np.reciprocal(alpha, out=alpha)
+        for channel in range(3):
+            # plane += alpha * (color - plane)
+            delta = np.float32(color[channel]) - planes[channel]
+            delta *= alpha
+            planes[channel] += delta
+
+    if precise:
+        return planes
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    for channel in range(3):
+        planes[channel] += 0.5
+        out[..., channel] = planes[channel]
+    return Image.fromarray(out)
+
+
+def field_canvas_size(width, height):
+    """Returns the size field canvases are evaluated at for width x height."""
+    scale = min(1.0, max(FIELD_SCALE, FIELD_MIN_WIDTH / width))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def mesh_field_canvas(
+    width,
+    height,
+    colors,
+    blob_count=None,
+    blur_intensity=1.0,
+    blob_size="medium",
+    rng=None,
+    precise=False,
+):
+    """
+    Field engine counterpart of mesh_canvas: evaluates the blob fields on a
+    reduced canvas with the aspect ratio of width x height. upscale_mesh
+    (upscale_mesh_dithered with precise) turns it into the final image.
+    """
+    blobs = mesh_field_blobs(colors, blob_count, blob_size, rng)
+    small_w, small_h = field_canvas_size(width, height)
+    return render_mesh_field(
+        small_w, small_h, hex_to_rgb(colors[0]), blobs, blur_intensity, precise
+    )
+
+
+def create_field_mesh_gradient(
+    width,
+    height,
+    colors,
+    blob_count=None,
+    blur_intensity=1.0,
+    blob_size="medium",
+    rng=None,
+):
+    """
+    Field engine alternative to create_mesh_gradient, taking the same
+    arguments. Blobs are evaluated analytically in normalized coordinates
+    with no blur pass, so their placement and look do not depend on the
+    resolution.
+    """
+    small_img = mesh_field_canvas(
+        width, height, colors, blob_count, blur_intensity, blob_size, rng
+    )
+    return upscale_mesh(small_img, width, height)
+
+
+def apply_noise(image, intensity=0.05, rng=None):
     """
     Adds film grain/noise to the image.
     intensity: 0.0 to 1.0
+    rng: np.random.RandomState to draw from (default: global np.random)
     """
     if intensity <= 0:
         return image
 
     width, height = image.size
     # Generate noise array
-    noise = np.random.normal(0, 255 * intensity, (height, width, 3)).astype(np.float32)
+    rng = rng or np.random
+    noise = rng.normal(0, 255 * intensity, (height, width, 3)).astype(np.float32)
 
     # Convert image to numpy
     img_arr = np.array(image).astype(np.float32)
@@ -185,23 +466,130 @@ def apply_sharpness(image, factor=1.0):
     return enhancer.enhance(factor)
 
 
-def composite_logo(background, logo_path, position, scale=1.0):
+# Fixed-point weights PIL uses for RGB -> L conversion
+_LUMA_WEIGHTS = (19595 / 65536, 38470 / 65536, 7471 / 65536)
+
+
+def _blend_lut(lut, degenerate, factor):
+    """
+    Blends a 256-entry float32 LUT towards a constant the way
+    Image.blend does (float32 maths, clipped and truncated to 8 bits).
+    """
+    degenerate = np.float32(degenerate)
+    out = degenerate + np.float32(factor) * (lut - degenerate)
+    return np.clip(out, 0, 255).astype(np.uint8).astype(np.float32)
+
+
+def _point_table(lut):
+    return lut.astype(np.uint8).tolist() * 3
+
+
+def luma_mean(image):
+    """Returns the rounded mean greyscale value ImageEnhance.Contrast uses."""
+    return histogram_mean(image.convert("L").histogram())
+
+
+def histogram_mean(hist):
+    """Returns the rounded mean of a 256-bin greyscale histogram."""
+    return int(sum(i * n for i, n in enumerate(hist)) / sum(hist) + 0.5)
+
+
+def adjust_colors(image, brightness=1.0, contrast=1.0, saturation=1.0, mean=None):
+    """
+    Fused equivalent of apply_brightness, apply_contrast and apply_saturation
+    applied in that order.
+
+    Brightness and contrast are per-channel maps and are folded into a
+    single 256-entry LUT applied with one Image.point pass. Saturation is
+    linear in RGB and runs as one colour-matrix conversion. Only the
+    contrast mean needs an extra greyscale pass, and a second LUT pass
+    when brightness is also enabled. Results match the ImageEnhance chain
+    within +-1 per channel value.
+
+    mean overrides the greyscale mean contrast is pivoted around, for
+    callers adjusting one part of a larger image at a time.
+    """
+    if brightness == 1.0 and contrast == 1.0 and saturation == 1.0:
+        return image
+
+    lut = np.arange(256, dtype=np.float32)
+    if brightness != 1.0:
+        lut = _blend_lut(lut, 0, brightness)
+
+    if contrast != 1.0 and mean is None:
+        if brightness != 1.0:
+            # The contrast mean is taken from the brightened image
+            image = image.point(_point_table(lut))
+            lut = np.arange(256, dtype=np.float32)
+        mean = luma_mean(image)
+    if contrast != 1.0:
+        lut = _blend_lut(lut, mean, contrast)
+
+    if brightness != 1.0 or contrast != 1.0:
+        image = image.point(_point_table(lut))
+
+    if saturation != 1.0:
+        # grey + s * (v - grey) per channel; the -0.5 offset turns the
+        # matrix conversion's rounding into Image.blend's truncation
+        matrix = []
+        for channel in range(3):
+            row = [(1 - saturation) * w for w in _LUMA_WEIGHTS]
+            row[channel] += saturation
+            matrix.extend(row + [-0.5])
+        image = image.convert("RGB", matrix)
+
+    return image
+
+
+# Logo distance from the edges, in pixels at native logo size
+LOGO_PADDING = 50
+
+# Output height at which config['logo_scale'] is the logo's pixel scale
+LOGO_REFERENCE_HEIGHT = 1080
+
+
+def logo_placement(config, height, zoom=1.0):
+    """
+    Returns the (scale, padding) composite_logo uses for config on an
+    output height pixels tall. Without config['logo_scale'] the logo keeps
+    its pixel size at every resolution; with it, logo and padding scale
+    with the output height relative to LOGO_REFERENCE_HEIGHT. zoom scales
+    both further, e.g. for previews.
+    """
+    logo_scale = config.get("logo_scale")
+    if logo_scale is None:
+        return zoom, round(LOGO_PADDING * zoom)
+    relative = height / LOGO_REFERENCE_HEIGHT * zoom
+    return logo_scale * relative, round(LOGO_PADDING * relative)
+
+
+def composite_logo(background, logo_path, position, scale=1.0, padding=None):
+    """
+    Pastes the logo at logo_path onto background at position, resized by
+    scale and padding pixels away from the edges (default: LOGO_PADDING).
+    Decoded and scaled logos come from the shared logo cache.
+    """
     try:
-        logo = Image.open(logo_path).convert("RGBA")
+        logo = get_logo_cache().get(logo_path, scale)
     except Exception:
         # Silently fail - TUI handles errors
         return background
 
-    # Resize logo if needed (optional, keeping it simple for now, maybe max 50% of height)
-    # Let's say we don't resize unless strictly requested, but user said "previously edited correctly"
-    # So we trust the size, but maybe we ensure it's not BIGGER than the BG.
+    # Paste with alpha
+    origin = logo_origin(background.size, logo.size, position, padding)
+    background.paste(logo, origin, logo)
+    return background
+
 
-    bg_w, bg_h = background.size
-    logo_w, logo_h = logo.size
+def logo_origin(background_size, logo_size, position, padding=None):
+    """Returns the top-left corner a logo is pasted at for position."""
+    bg_w, bg_h = background_size
+    logo_w, logo_h = logo_size
 
     # Calculate coordinates
     x, y = 0, 0
-    padding = 50  # padding from edges
+    if padding is None:
+        padding = LOGO_PADDING  # padding from edges
 
     if position == "center":
         x = (bg_w - logo_w) // 2
@@ -225,91 +613,511 @@ def composite_logo(background, logo_path, position, scale=1.0):
         x = bg_w - logo_w - padding
         y = bg_h - logo_h - padding
 
-    # Paste with alpha
-    background.paste(logo, (x, y), logo)
-    return background
+    return x, y
+
+
+# Part of every render cache key: bump whenever the pixels produced for a
+# given config change, so stale cache entries are never served
+RENDER_VERSION = 3
+
+
+# config['mesh_engine'] -> function drawing the reduced mesh canvas
+MESH_ENGINES = {
+    "classic": mesh_canvas,
+    "field": mesh_field_canvas,
+}
+
+
+def mesh_engine(config):
+    """Returns the mesh canvas function selected by config['mesh_engine']."""
+    engine = config.get("mesh_engine", "classic")
+    try:
+        return MESH_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown mesh engine: {engine}") from None
 
 
-def generate_wallpaper(config):
+def make_rngs(seed):
+    """
+    Returns a (random.Random, np.random.RandomState) pair seeded with seed.
+    They produce the same streams as seeding the global random/np.random,
+    but belong to a single render task only.
+    """
+    return random.Random(seed), np.random.RandomState(seed)
+
+
+def create_background(width, height, config, rng=None):
+    """Renders the background for the configured mode at the given size."""
+    mode = config.get("mode", "solid")
+    colors = config.get("colors", ["#000000"])
+
+    if mode == "solid":
+        return create_solid_background(width, height, colors[0])
+    elif mode == "gradient_linear":
+        return linear_gradient(width, height, config)
+    elif mode == "gradient_mesh":
+        blob_count = config.get("mesh_blob_count")
+        blur_intensity = config.get("mesh_blur_intensity", 1.0)
+        blob_size = config.get("mesh_blob_size", "medium")
+        precise = bool(config.get("dither"))
+        canvas = mesh_engine(config)(
+            width, height, colors, blob_count, blur_intensity, blob_size, rng, precise
+        )
+        if precise:
+            return upscale_mesh_dithered(canvas, width, height)
+        return upscale_mesh(canvas, width, height)
+    elif mode == "animated":
+        # Stills of an animation (previews, etc.) show its first frame
+        from wpgen.animate import Animation
+
+        return Animation(width, height, config, rng).background(0)
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def has_color_adjustments(config):
+    keys = ("brightness", "contrast", "saturation")
+    return any(config.get(key, 1.0) != 1.0 for key in keys)
+
+
+def apply_color_adjustments(img, config):
+    """Applies the brightness, contrast and saturation settings of config."""
+    return adjust_colors(
+        img,
+        config.get("brightness", 1.0),
+        config.get("contrast", 1.0),
+        config.get("saturation", 1.0),
+    )
+
+
+NOISE_ENGINES = ("grain", "classic")
+
+
+def noise_engine(config):
+    """
+    Returns config['noise_engine']: 'grain' (cached tileable textures, see
+    wpgen.grain) or 'classic' (apply_noise, a fresh draw per render).
+    """
+    engine = config.get("noise_engine", "grain")
+    if engine not in NOISE_ENGINES:
+        raise ValueError(f"Unknown noise engine: {engine}")
+    return engine
+
+
+def apply_effects(img, config, color_adjustments=True, np_rng=None, recorder=None):
+    """
+    Applies the effects chain of config in pipeline order:
+    noise, blur, brightness/contrast/saturation, sharpness. With
+    config['threads'] above 1 every stage runs band-parallel on that many
+    threads, up to one per CPU (see wpgen.tiled.apply_effects_threaded).
+    """
+    # More threads than cores only add halo and hand-over work
+    threads = min(config.get("threads") or 1, os.cpu_count() or 1)
+    if threads > 1:
+        from wpgen.tiled import apply_effects_threaded
+
+        return apply_effects_threaded(
+            img, config, threads, color_adjustments, np_rng, recorder
+        )
+
+    width, height = img.size
+
+    noise_level = config.get("noise", 0)
+    if noise_level > 0:
+        with span(recorder, "noise", width, height):
+            if noise_engine(config) == "grain":
+                img = grain.add_grain(
+                    img,
+                    noise_level,
+                    config.get("seed", 42),
+                    config.get("noise_mono", False),
+                )
+            else:
+                img = apply_noise(img, noise_level, np_rng)
+
+    blur_radius = config.get("blur", 0)
+    if blur_radius > 0:
+        with span(recorder, "blur", width, height):
+            img = apply_blur(img, blur_radius)
+
+    if color_adjustments and has_color_adjustments(config):
+        with span(recorder, "color", width, height):
+            img = apply_color_adjustments(img, config)
+
+    sharpness = config.get("sharpness", 1.0)
+    if sharpness != 1.0:
+        with span(recorder, "sharpness", width, height):
+            img = apply_sharpness(img, sharpness)
+
+    return img
+
+
+def finish_wallpaper(img, config, recorder=None):
+    """Composites the logo (if any) onto a rendered wallpaper."""
+    logo_path = config.get("logo_path")
+    if logo_path:
+        pos = config.get("position", "center")
+        scale, padding = logo_placement(config, img.height)
+        with span(recorder, "logo", *img.size):
+            img = composite_logo(img, logo_path, pos, scale, padding)
+    return img
+
+
+def output_path(config, width, height):
+    """Returns the file path a resolution of config is saved to."""
+    output_dir = config.get("output_dir", ".")
+    if config.get("mode") == "animated":
+        fmt = config.get("animation_format", "webp")
+        ext = encoders.animation_extension(fmt)
+    else:
+        ext = encoders.extension(config.get("format", "png"))
+    return os.path.join(output_dir, f"wallpaper_{width}x{height}{ext}")
+
+
+def save_wallpaper(img, config):
+    """
+    Encodes img into the configured output directory with the configured
+    format, preset and encoder options. Returns an EncodeResult.
+    """
+    filename = output_path(config, *img.size)
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    return encoders.encode(
+        img,
+        filename,
+        config.get("format", "png"),
+        config.get("preset", "balanced"),
+        config.get("encoder_options"),
+    )
+
+
+def stream_wallpaper(width, height, config, rngs=None, recorder=None):
+    """
+    Renders a single resolution strip by strip (see wpgen.tiled) and
+    streams the strips straight into a PNG file, so the full frame never
+    exists in memory. Returns an EncodeResult. Only the PNG format can be
+    streamed.
+    """
+    from wpgen.tiled import render_bands
+
+    if config.get("format", "png") != "png":
+        raise ValueError("Streamed output is only supported for the png format")
+    rng, _ = rngs or make_rngs(config.get("seed", 42))
+    filename = output_path(config, width, height)
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    bands = render_bands(
+        width, height, config, config.get("tile_rows"), rng, recorder
+    )
+    return encoders.encode_stream(
+        (band for _, band in bands),
+        filename,
+        width,
+        height,
+        config.get("preset", "balanced"),
+        config.get("encoder_options"),
+    )
+
+
+def covering_canvas(resolutions):
+    """
+    Returns the smallest canvas from which every resolution can be cut as a
+    centered crop of its own aspect ratio without upscaling.
+    """
+    return max(w for w, _ in resolutions), max(h for _, h in resolutions)
+
+
+def resample_from_base(base, width, height):
+    """
+    Derives a width x height frame from a larger base render by taking the
+    largest centered crop with the target aspect ratio and downscaling it.
+    """
+    base_w, base_h = base.size
+    crop_w = min(base_w, base_h * width / height)
+    crop_h = min(base_h, base_w * height / width)
+    left = (base_w - crop_w) / 2
+    top = (base_h - crop_h) / 2
+    box = (left, top, left + crop_w, top + crop_h)
+    if (width, height) == (base_w, base_h):
+        return base.copy()
+    return base.resize((width, height), Image.Resampling.LANCZOS, box=box)
+
+
+def render_wallpaper(width, height, config, rngs=None, recorder=None):
+    """
+    Runs the full pipeline for a single resolution and returns the image.
+    With config['tile_rows'] (or 'stream') set it renders in strips of
+    that many rows (see wpgen.tiled), bounding intermediate memory by the
+    strip size. With config['low_memory'] every stage works in place on
+    one frame buffer instead (see wpgen.lowmem).
+    """
+    rng, np_rng = rngs or make_rngs(config.get("seed", 42))
+    if config.get("tile_rows") or config.get("stream"):
+        from wpgen.tiled import render_tiled
+
+        return render_tiled(
+            width, height, config, config.get("tile_rows"), rng, recorder
+        )
+    if config.get("low_memory"):
+        from wpgen.lowmem import render_low_memory
+
+        return render_low_memory(width, height, config, (rng, np_rng), recorder)
+    with span(recorder, "background", width, height):
+        img = create_background(width, height, config, rng)
+    img = apply_effects(img, config, np_rng=np_rng, recorder=recorder)
+    return finish_wallpaper(img, config, recorder)
+
+
+def render_preview(config, max_pixels):
+    """
+    Renders config for live previews, shrunk from its first resolution to
+    about max_pixels pixels (never enlarged), so a preview costs the same
+    whatever the output size. Pixel-sized settings (blur, logo size and
+    padding) are scaled along; nothing is saved.
+    """
+    base_w, base_h = parse_resolutions(config.get("resolutions"))[0]
+    scale = min(1.0, (max_pixels / (base_w * base_h)) ** 0.5)
+    width = max(1, round(base_w * scale))
+    height = max(1, round(base_h * scale))
+    seed = config.get("seed")
+    if seed is None:
+        # Unseeded renders are random; the preview stays put while editing
+        seed = 42
+    preview_config = dict(config, blur=config.get("blur", 0) * scale, seed=seed)
+    rng, np_rng = make_rngs(seed)
+    img = create_background(width, height, preview_config, rng)
+    img = apply_effects(img, preview_config, np_rng=np_rng)
+    logo_path = config.get("logo_path")
+    if logo_path:
+        logo_scale, padding = logo_placement(config, base_h, scale)
+        pos = config.get("position", "center")
+        img = composite_logo(img, logo_path, pos, logo_scale, padding)
+    return img
+
+
+class RenderResult(NamedTuple):
+    """Outcome of one render task, as handed to on_result callbacks."""
+
+    index: int  # Position of the task's config in the submitted list
+    resolutions: list
+    paths: list
+    error: Optional[BaseException] = None
+    encodes: Optional[list] = None  # EncodeResults of outputs not served from cache
+    stages: Optional[list] = None  # StageRecords, with config['instrument'] only
+    peak_rss: Optional[int] = None  # Bytes the rendering process peaked at (Linux)
+
+
+def plan_tasks(config):
+    """
+    Splits a config into independent render tasks, each a list of
+    resolutions. Every resolution is its own task, except in 'shared_base'
+    mode where all of them derive from one base render.
+    """
+    resolutions = parse_resolutions(config.get("resolutions"))
+    if config.get("shared_base") and config.get("mode") != "animated":
+        return [resolutions]
+    return [[res] for res in resolutions]
+
+
+def render_task(config, resolutions, encodes=None, recorder=None):
+    """
+    Renders and saves the given resolutions of config, returning the paths.
+    The EncodeResult of every output actually encoded is appended to
+    encodes, if given, and every stage is timed into recorder, if given.
+
+    Every resolution draws from its own RNG streams seeded with
+    config['seed'], so a task's output does not depend on which process
+    runs it or on what ran before.
+    """
+    # Use a fixed seed for consistent randomness across all resolutions
+    # User can override with config['seed'] if desired
+    seed = config.get("seed", 42)
+
+    filenames = []
+    missing = []
+    animated = config.get("mode") == "animated"
+    render_cache = get_cache() if config.get("cache", True) else None
+    if animated and config.get("animation_format", "webp") == "frames":
+        # Frame directories are not single files the cache could hold
+        render_cache = None
+    for width, height in resolutions:
+        key = render_cache and render_key(config, width, height, RENDER_VERSION)
+        dest = output_path(config, width, height)
+        if key:
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            with span(recorder, "cache", width, height):
+                hit = render_cache.fetch(key, dest)
+            if hit:
+                filenames.append(dest)
+                continue
+        missing.append((width, height, key))
+
+    if config.get("shared_base") and missing:
+        # The base always covers the whole task, hits included, so a partial
+        # hit renders the same frames as a cold run
+        rng, _ = make_rngs(seed)
+        canvas = covering_canvas(resolutions)
+        with span(recorder, "background", *canvas):
+            base = create_background(*canvas, config, rng)
+        if has_color_adjustments(config):
+            with span(recorder, "color", *canvas):
+                base = apply_color_adjustments(base, config)
+
+    for width, height, key in missing:
+        # Fresh streams per resolution to ensure identical patterns
+        rngs = make_rngs(seed)
+
+        if animated:
+            from wpgen.animate import render_animation
+
+            img = None
+            encoded = render_animation(width, height, config, recorder)
+        elif config.get("shared_base"):
+            with span(recorder, "resample", width, height):
+                img = resample_from_base(base, width, height)
+            img = apply_effects(
+                img, config, False, np_rng=rngs[1], recorder=recorder
+            )
+            img = finish_wallpaper(img, config, recorder)
+        elif config.get("stream") and config.get("format", "png") == "png":
+            # Rendering and encoding interleave; the encoder's own time is
+            # reported in the EncodeResult
+            img = None
+            encoded = stream_wallpaper(width, height, config, rngs, recorder)
+        elif config.get("low_memory") and not (
+            config.get("tile_rows") or config.get("stream")
+        ):
+            from wpgen.lowmem import save_low_memory
+
+            img = None
+            encoded = save_low_memory(width, height, config, rngs, recorder)
+        else:
+            img = render_wallpaper(width, height, config, rngs, recorder)
+
+        # Output handled by TUI
+        if img is not None:
+            with span(recorder, "encode", width, height):
+                encoded = save_wallpaper(img, config)
+        if encodes is not None:
+            encodes.append(encoded)
+        if key:
+            render_cache.store(key, encoded.path)
+        filenames.append(encoded.path)
+
+    # Report in resolution order regardless of which ones were cached
+    order = [output_path(config, w, h) for w, h in resolutions]
+    return sorted(filenames, key=order.index)
+
+
+def generate_wallpaper(config, on_result=None, job=None):
     """
     Main entry point.
     config = {
-        'mode': 'solid' | 'gradient_linear' | 'gradient_mesh',
+        'mode': 'solid' | 'gradient_linear' | 'gradient_mesh' | 'animated',
         'colors': ['#ffffff', ...],
+        'gradient_direction': 'vertical' | 'horizontal' | 'diagonal_tl_br' |
+            'diagonal_tr_bl' | 'radial',  # Default: 'vertical'
+        'gradient_stops': [0.0, 0.3, 1.0],  # Optional: one position per colour
+        'gradient_interpolation': 'srgb' | 'linear' | 'oklab',  # Default: 'srgb'
+        'dither': bool,  # Optional: blue-noise dither gradients and meshes
         'logo_path': 'path/to/logo.png' | None,
         'position': 'center',
         'noise': 0.05,
         'output_dir': '.',
-        'seed': int | None  # Optional: for reproducible randomness
+        'seed': int | None,  # Optional: for reproducible randomness
+        'resolutions': ['3840x2160', [5120, 1440], ...],  # Default: RESOLUTIONS
+        'mesh_engine': 'classic' | 'field',  # Default: 'classic'
+        'noise_engine': 'grain' | 'classic',  # Default: 'grain'
+        'noise_mono': bool,  # Optional: same grain on all channels (grain only)
+        'tile_rows': int,  # Optional: render in strips of that many rows
+        'stream': bool,  # Optional: stream strips straight into PNG files
+        'shared_base': bool,  # Optional: render once, resample per resolution
+        'workers': int,  # Optional: render tasks in that many processes
+        'threads': int,  # Optional: run the effects chain on that many threads
+        'low_memory': bool,  # Optional: run every stage in place on one buffer
+        'memory_budget': int | '4G',  # Optional: peak RSS allowed across workers
+        'cache': bool,  # Optional: reuse identical earlier renders (default: True)
+        'format': 'png' | 'webp' | 'jpeg' | 'qoi' | 'raw',  # Default: 'png'
+        'preset': 'fast' | 'balanced' | 'smallest',  # Default: 'balanced'
+        'encoder_options': {...},  # Optional: PIL save settings overriding the preset
+        'instrument': bool  # Optional: record time/memory per stage (default: False)
     }
-    """
-    resolutions = [(1920, 1080), (2560, 1440), (1920, 1200)]
 
-    # Use a fixed seed for consistent randomness across all resolutions
-    # User can override with config['seed'] if desired
-    seed = config.get("seed", 42)
+    Mode 'animated' renders a looping animation per resolution instead
+    of a still (see wpgen.animate for its settings); there 'workers' is
+    the number of processes rendering frames.
 
-    for width, height in resolutions:
-        # Reset random state before each resolution to ensure identical patterns
-        random.seed(seed)
-        np.random.seed(seed)
-
-        mode = config.get("mode", "solid")
-        colors = config.get("colors", ["#000000"])
-
-        if mode == "solid":
-            img = create_solid_background(width, height, colors[0])
-        elif mode == "gradient_linear":
-            c1 = colors[0]
-            c2 = colors[1] if len(colors) > 1 else colors[0]
-            direction = config.get("gradient_direction", "vertical")
-            img = create_linear_gradient(width, height, c1, c2, direction)
-        elif mode == "gradient_mesh":
-            blob_count = config.get("mesh_blob_count")
-            blur_intensity = config.get("mesh_blur_intensity", 1.0)
-            blob_size = config.get("mesh_blob_size", "medium")
-            img = create_mesh_gradient(
-                width, height, colors, blob_count, blur_intensity, blob_size
-            )
+    Returns the list of written file paths. on_result, if given, is called
+    with a RenderResult as each render task completes.
 
-        # Apply effects
-        noise_level = config.get("noise", 0)
-        if noise_level > 0:
-            img = apply_noise(img, noise_level)
+    job, a wpgen.jobs.Job, receives progress at every stage boundary and
+    makes each boundary a cancellation checkpoint: once the job is
+    cancelled, RenderCancelled is raised there. With 'workers' above 1
+    stages run in other processes, so progress and cancellation happen
+    per render task.
 
-        blur_radius = config.get("blur", 0)
-        if blur_radius > 0:
-            img = apply_blur(img, blur_radius)
+    With 'low_memory' the full-frame pipeline keeps a single uint8 buffer
+    that every stage updates in place, with identical output (see
+    wpgen.lowmem); 'tile_rows' and 'stream' take precedence over it, and
+    'shared_base' and animations ignore it. RenderResult.peak_rss reports
+    the peak RSS of every render task. With 'workers' above 1,
+    'memory_budget' (bytes, or a size like "4G") caps the summed estimated
+    peak RSS of the tasks running at once (see wpgen.parallel).
 
-        brightness = config.get("brightness", 1.0)
-        if brightness != 1.0:
-            img = apply_brightness(img, brightness)
+    With 'shared_base' the background and the colour adjustments are
+    rendered once on a canvas covering every resolution, and each output
+    is derived from it by a centered crop plus a Lanczos downscale. Noise,
+    blur, sharpness and the logo are still applied at native resolution,
+    so grain and logo stay crisp. Compared to the per-resolution pipeline
+    the colour adjustments run before the noise instead of after it, and
+    outputs whose aspect ratio differs from the canvas show a cropped
+    section of the composition.
+    """
+    tasks = plan_tasks(config)
+    if job:
+        job.start(tasks)
 
-        contrast = config.get("contrast", 1.0)
-        if contrast != 1.0:
-            img = apply_contrast(img, contrast)
+    workers = config.get("workers") or 1
+    if workers > 1 and config.get("mode") != "animated":
+        from wpgen.parallel import render_parallel
 
-        saturation = config.get("saturation", 1.0)
-        if saturation != 1.0:
-            img = apply_saturation(img, saturation)
+        def report(result):
+            if job:
+                job.task_done(result.resolutions)
+            if on_result:
+                on_result(result)
+            if job:
+                job.checkpoint()
 
-        sharpness = config.get("sharpness", 1.0)
-        if sharpness != 1.0:
-            img = apply_sharpness(img, sharpness)
+        results = render_parallel(
+            [config], workers, report, config.get("memory_budget")
+        )
+        for result in results:
+            if result.error is not None:
+                raise result.error
+        return [path for result in results for path in result.paths]
 
-        # Composite Logo
-        logo_path = config.get("logo_path")
-        if logo_path:
-            pos = config.get("position", "center")
-            img = composite_logo(img, logo_path, pos)
-
-        # Save
-        output_dir = config.get("output_dir", ".")
-        os.makedirs(output_dir, exist_ok=True)
-        filename = os.path.join(output_dir, f"wallpaper_{width}x{height}.png")
-        img.save(filename)
-        # Output handled by TUI
-        # Output handled by TUI
+    filenames = []
+    for resolutions in tasks:
+        encodes = []
+        recorder = Recorder() if config.get("instrument") else None
+        if job:
+            job.begin_task(resolutions)
+            recorder = job.recorder(recorder)
+        try:
+            with PeakWindow() as window:
+                paths = render_task(config, resolutions, encodes, recorder)
+        finally:
+            if recorder:
+                recorder.close()
+        if job:
+            job.task_done(resolutions)
+        if on_result:
+            stages = recorder.records if recorder else None
+            on_result(
+                RenderResult(
+                    0, resolutions, paths, None, encodes, stages, window.peak
+                )
+            )
+        filenames.extend(paths)
+    return filenames
 
 
 if __name__ == "__main__":
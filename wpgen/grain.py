@@ -0,0 +1,149 @@
+"""
+Film grain from cached, tileable noise textures.
+
+A grain texture is a GRAIN_TILE x GRAIN_TILE block of integer noise drawn
+once per (seed, intensity, mono) from an np.random.Generator and kept in
+memory and on disk (~/.cache/wpgen/grain), both LRU-bounded. It is applied by tiling it
+over the image with an in-place saturating integer add.
+
+The texture holds floor(N(0, 255 * intensity)) per pixel and channel. For
+8-bit input, clip(v + floor(n)) equals apply_noise's truncated
+clip(v + n), so the output has the same distribution as apply_noise; only
+the pattern differs. White noise has no spatial correlation, so the tile
+wraps without seams, and the tile is large enough for repeats not to show
+through the image content.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from wpgen.cache import atomic_write, cache_root
+
+GRAIN_TILE = 1024
+
+# Textures kept decoded in memory (a colour texture is 6 MiB)
+MEMORY_ENTRIES = 8
+
+# Size of the on-disk texture cache; least recently used files go first
+DISK_MAX_BYTES = 256 * 1024 * 1024
+
+_textures = OrderedDict()
+_lock = threading.Lock()
+
+
+def default_grain_dir():
+    return cache_root() / "grain"
+
+
+def _generate(seed, intensity, mono, size):
+    rng = np.random.default_rng(seed)
+    channels = 1 if mono else 3
+    noise = rng.standard_normal((size, size, channels), dtype=np.float32)
+    noise *= np.float32(255 * intensity)
+    return np.floor(noise, out=noise).astype(np.int16)
+
+
+def grain_texture(seed, intensity, mono=False, size=GRAIN_TILE, directory=None):
+    """
+    Returns the int16 grain texture of shape (size, size, 3), or
+    (size, size, 1) for mono grain, for seed and intensity. Seeded textures
+    are cached in memory and in directory (default: default_grain_dir());
+    seed None draws a fresh, uncached texture.
+    """
+    if seed is None:
+        return _generate(None, intensity, mono, size)
+
+    key = (seed, float(intensity), bool(mono), size)
+    with _lock:
+        texture = _textures.get(key)
+        if texture is not None:
+            _textures.move_to_end(key)
+            return texture
+
+    directory = directory or default_grain_dir()
+    kind = "mono" if mono else "rgb"
+    path = os.path.join(directory, f"{seed}_{float(intensity)!r}_{kind}_{size}.npy")
+    try:
+        texture = np.load(path)
+        os.utime(path)
+    except (OSError, ValueError):
+        texture = _generate(seed, intensity, mono, size)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with atomic_write(path) as f:
+                np.save(f, texture)
+            _evict(directory)
+        except OSError:
+            # A read-only cache only costs regenerating the texture
+            pass
+
+    texture.flags.writeable = False
+    with _lock:
+        _textures[key] = texture
+        while len(_textures) > MEMORY_ENTRIES:
+            _textures.popitem(last=False)
+    return texture
+
+
+def _evict(directory):
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".npy"):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue  # Evicted concurrently by another worker
+        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= DISK_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def apply_grain(pixels, texture, row_offset=0):
+    """
+    Adds texture to a (height, width, 3) uint8 array in place, saturating
+    at 0 and 255. row_offset is the frame row pixels starts at, so strips
+    of a frame line up with the texture as the whole frame would.
+    """
+    height, width = pixels.shape[:2]
+    size = texture.shape[0]
+    y = 0
+    while y < height:
+        ty = (row_offset + y) % size
+        rows = min(height - y, size - ty)
+        for x in range(0, width, size):
+            cols = min(width - x, size)
+            block = pixels[y : y + rows, x : x + cols]
+            tmp = block.astype(np.int16)
+            tmp += texture[ty : ty + rows, :cols]
+            np.clip(tmp, 0, 255, out=tmp)
+            block[...] = tmp
+        y += rows
+    return pixels
+
+
+def add_grain(image, intensity=0.05, seed=42, mono=False):
+    """
+    Cached-texture counterpart of apply_noise: returns image with grain of
+    the given intensity (0.0 to 1.0). mono applies the same value to all
+    three channels.
+    """
+    if intensity <= 0:
+        return image
+    pixels = np.array(image.convert("RGB"))
+    apply_grain(pixels, grain_texture(seed, intensity, mono))
+    return Image.fromarray(pixels)
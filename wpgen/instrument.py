@@ -0,0 +1,202 @@
+import contextlib
+import ctypes
+import ctypes.util
+import functools
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import NamedTuple
+
+
+def _proc_status(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux), or None."""
+    return _proc_status("VmRSS")
+
+
+def peak_rss():
+    """Peak resident set size since the last reset in bytes (Linux), or None."""
+    return _proc_status("VmHWM")
+
+
+@functools.cache
+def _malloc_trim():
+    # Looking libc up costs milliseconds; do it once per process
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim
+    except (OSError, AttributeError, TypeError):
+        return None  # Not glibc
+
+
+def trim_heap():
+    """Hands freed heap pages back to the kernel so they don't hide growth."""
+    malloc_trim = _malloc_trim()
+    if malloc_trim is not None:
+        malloc_trim(0)
+
+
+# Open PeakWindows; every watermark reset folds the peak so far into them
+_windows = []
+_windows_lock = threading.Lock()
+
+
+def reset_peak_rss():
+    """Resets the kernel's peak-RSS watermark (Linux only). Returns success."""
+    with _windows_lock:
+        if _windows:
+            peak = peak_rss()
+            for window in _windows:
+                window.fold(peak)
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+
+class PeakWindow:
+    """
+    Context manager measuring the peak RSS of the process while its block
+    runs, in bytes (Linux). Stage spans and other windows may reset the
+    kernel's watermark in the meantime; the peak before each reset is kept.
+    peak is None where the watermark cannot be reset.
+
+    With trim, freed heap pages are handed back first (see trim_heap), so
+    the peak does not include memory earlier work left resident. That
+    costs a heap walk, too much for every small render.
+    """
+
+    def __init__(self, trim=False):
+        self.peak = None
+        self.trim = trim
+        self._folded = 0
+        self._supported = False
+
+    def fold(self, peak):
+        if peak is not None:
+            self._folded = max(self._folded, peak)
+
+    def __enter__(self):
+        if self.trim:
+            trim_heap()
+        self._supported = reset_peak_rss() and current_rss() is not None
+        with _windows_lock:
+            _windows.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _windows_lock:
+            _windows.remove(self)
+            peak = peak_rss()
+        if self._supported and peak is not None:
+            self.peak = max(self._folded, peak)
+        return False
+
+
+class StageRecord(NamedTuple):
+    stage: str
+    width: int
+    height: int
+    wall: float  # Seconds
+    cpu: float  # Seconds of CPU time of the rendering thread
+    alloc_bytes: int  # Peak memory growth while the stage ran
+
+
+class Recorder:
+    """
+    Collects a StageRecord per pipeline stage and resolution.
+
+    Memory is measured as peak RSS growth where the kernel lets the
+    watermark be reset (this includes PIL's buffers, which tracemalloc
+    cannot see) and as tracemalloc's peak elsewhere. A disabled pipeline
+    passes no recorder at all; see span().
+    """
+
+    def __init__(self):
+        self.records = []
+        self._use_rss = reset_peak_rss() and current_rss() is not None
+        self._started_tracing = False
+        if not self._use_rss and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextlib.contextmanager
+    def span(self, stage, width, height):
+        if self._use_rss:
+            trim_heap()
+            reset_peak_rss()
+            before = current_rss()
+        else:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            if self._use_rss:
+                peak = peak_rss()
+            else:
+                peak = tracemalloc.get_traced_memory()[1]
+            self.records.append(
+                StageRecord(stage, width, height, wall, cpu, max(peak - before, 0))
+            )
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def span(recorder, stage, width, height):
+    """Returns recorder's span for a stage, or a shared no-op without recorder."""
+    if recorder is None:
+        return _NULL_SPAN
+    return recorder.span(stage, width, height)
+
+
+def record_fields(record):
+    """Flattens a StageRecord into key/value pairs for structured logs."""
+    return {
+        "stage": record.stage,
+        "resolution": f"{record.width}x{record.height}",
+        "wall_ms": f"{record.wall * 1000:.1f}",
+        "cpu_ms": f"{record.cpu * 1000:.1f}",
+        "alloc_mb": f"{record.alloc_bytes / (1024 * 1024):.1f}",
+    }
+
+
+def format_summary(records):
+    """Renders records as a table with one row per resolution and stage."""
+    rows = defaultdict(lambda: [0.0, 0.0, 0])
+    for r in records:
+        row = rows[(f"{r.width}x{r.height}", r.stage)]
+        row[0] += r.wall
+        row[1] += r.cpu
+        row[2] = max(row[2], r.alloc_bytes)
+
+    header = f"{'resolution':11} {'stage':10} {'wall ms':>9} {'cpu ms':>9} {'peak MB':>8}"
+    lines = [header]
+    for (resolution, stage), (wall, cpu, alloc) in rows.items():
+        lines.append(
+            f"{resolution:11} {stage:10} {wall * 1000:9.1f} {cpu * 1000:9.1f} "
+            f"{alloc / (1024 * 1024):8.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,144 @@
+"""
+Cancellable generation jobs with progress reporting.
+
+A Job owns a private snapshot of its config, taken when it is created, so
+later edits in the UI cannot reach a render in flight. Passed to
+generate_wallpaper, it sees every pipeline stage boundary (the same spans
+the instrumentation times): each one reports progress and is a
+cancellation checkpoint that raises RenderCancelled once the job has been
+cancelled. A cancelled job therefore stops within one stage, or one band
+in tiled and streamed renders; files are only ever replaced whole.
+"""
+
+import contextlib
+import copy
+import threading
+from typing import NamedTuple
+
+from wpgen.instrument import span
+
+# Pipeline stages in the order a resolution passes through them, for
+# progress within a resolution
+STAGE_ORDER = (
+    "cache",
+    "background",
+    "resample",
+    "noise",
+    "blur",
+    "color",
+    "sharpness",
+    "logo",
+    "encode",
+)
+
+
+class RenderCancelled(Exception):
+    """Raised at a stage boundary of a cancelled job."""
+
+
+class ProgressEvent(NamedTuple):
+    fraction: float  # Of the whole job, 0.0 to 1.0
+    stage: str  # Stage just finished, or "done" when a task completes
+    width: int
+    height: int
+    resolutions_done: int
+    resolutions_total: int
+
+
+class Job:
+    """One generation request; see the module docstring."""
+
+    def __init__(self, config, on_progress=None):
+        self.config = copy.deepcopy(config)
+        self.on_progress = on_progress
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._total = 0
+        self._done = 0
+        self._task_size = 1
+        self._task_fraction = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Asks the job to stop at its next stage boundary."""
+        self._cancelled.set()
+
+    def checkpoint(self):
+        if self._cancelled.is_set():
+            raise RenderCancelled()
+
+    def finish(self):
+        """Marks the job as no longer running, whether it completed or not."""
+        self._finished.set()
+
+    def wait(self, timeout=None):
+        """Waits until finish() was called. Returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    def start(self, tasks):
+        """Called with the job's render tasks (lists of resolutions)."""
+        self._total = sum(len(task) for task in tasks)
+        self._done = 0
+
+    def begin_task(self, resolutions):
+        self.checkpoint()
+        self._task_size = len(resolutions)
+        self._task_fraction = 0.0
+
+    def task_done(self, resolutions):
+        self._done += len(resolutions)
+        self._task_fraction = 0.0
+        width, height = resolutions[-1]
+        self._emit("done", width, height)
+
+    def recorder(self, recorder=None):
+        """Returns a recorder for a task's stages, wrapping recorder if given."""
+        return _JobRecorder(self, recorder)
+
+    def stage_done(self, stage, width, height):
+        if stage in STAGE_ORDER:
+            position = (STAGE_ORDER.index(stage) + 1) / len(STAGE_ORDER)
+            # Tiled renders repeat stages per band; never move backwards
+            self._task_fraction = max(self._task_fraction, position)
+        self._emit(stage, width, height)
+
+    def _emit(self, stage, width, height):
+        if self.on_progress is None or not self._total:
+            return
+        fraction = (self._done + self._task_fraction * self._task_size) / self._total
+        self.on_progress(
+            ProgressEvent(
+                min(fraction, 1.0), stage, width, height, self._done, self._total
+            )
+        )
+
+
+class _JobRecorder:
+    """
+    Stands in for a task's Recorder: checks for cancellation on entering
+    every stage and reports progress on leaving it, timing the stage into
+    the wrapped Recorder, if any.
+    """
+
+    def __init__(self, job, recorder):
+        self.job = job
+        self.inner = recorder
+
+    @property
+    def records(self):
+        return self.inner.records if self.inner else []
+
+    @contextlib.contextmanager
+    def span(self, stage, width, height):
+        self.job.checkpoint()
+        with span(self.inner, stage, width, height):
+            yield
+        self.job.stage_done(stage, width, height)
+
+    def close(self):
+        if self.inner:
+            self.inner.close()
+
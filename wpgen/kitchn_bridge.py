@@ -1,5 +1,9 @@
-import ctypes
+import atexit
+import contextlib
 import os
+import sys
+import threading
+from collections import deque
 
 # Path to the shared library
 # Assuming we are in /home/ryu/code/github.com/ryugen/wp-gen-pyjs
@@ -20,6 +24,9 @@ class KitchnBridge:
             print(f"Warning: Kitchn library not found at {LIB_PATH}. Logging disabled.")
             return
 
+        # Only loaded with the library, on the first log call
+        import ctypes
+
         try:
             self.lib = ctypes.CDLL(LIB_PATH)
 
@@ -100,42 +107,183 @@ def get_bridge():
     return _bridge
 
 
+# Records a LogSink buffers before it starts dropping the oldest ones
+SINK_CAPACITY = 1024
+
+# Seconds to wait for buffered records at exit
+FLUSH_TIMEOUT = 1.0
+
+
+class LogSink:
+    """
+    Hands log records to the bridge on a background thread.
+
+    log() and log_preset() only append to a bounded ring buffer and return,
+    so logging never waits on the library. The thread drains the buffer in
+    batches. When the buffer is full the oldest record is dropped and
+    counted in dropped instead of blocking the caller.
+    """
+
+    def __init__(self, bridge=None, capacity=SINK_CAPACITY):
+        self._bridge = bridge
+        self._records = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._pending = 0  # Buffered or being written
+        self._closed = False
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="kitchn-log", daemon=True
+        )
+        self._thread.start()
+
+    def log(self, level, scope, msg):
+        self._put((False, level, scope, msg))
+
+    def log_preset(self, preset_key, msg_override=None):
+        self._put((True, preset_key, msg_override))
+
+    def _put(self, record):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._records) == self._records.maxlen:
+                # The deque pushes out its oldest record
+                self.dropped += 1
+                self._pending -= 1
+            self._records.append(record)
+            self._pending += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        # The library loads here, off the thread of the first log call
+        bridge = self._bridge or get_bridge()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._records or self._closed)
+                batch = list(self._records)
+                self._records.clear()
+                if not batch:
+                    return
+            for preset, *args in batch:
+                if preset:
+                    bridge.log_preset(*args)
+                else:
+                    bridge.log(*args)
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every buffered record is written. Returns success."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        """Writes what is buffered, reports dropped records and stops the thread."""
+        if self.dropped:
+            self.log("info", "LOG", f"{self.dropped} log records dropped")
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = LogSink()
+            atexit.register(_sink.close)
+    return _sink
+
+
+@contextlib.contextmanager
+def native_output_silenced():
+    """
+    Sends what native code (the Kitchn library) writes to fds 1 and 2 to
+    /dev/null, once for the whole block, instead of swapping the fds around
+    every call. Python's standard streams, sys.__stdout__ and
+    sys.__stderr__ included, are pointed at duplicates of the original fds
+    first, so Python output still reaches the terminal. Enter it before a
+    Textual app is created, as the app keeps the streams it finds then.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = (sys.stdout, sys.stderr, sys.__stdout__, sys.__stderr__)
+    kept = []
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        for fd, stream in ((1, sys.__stdout__), (2, sys.__stderr__)):
+            kept.append(
+                os.fdopen(
+                    os.dup(fd),
+                    "w",
+                    buffering=1,
+                    encoding=stream.encoding,
+                    errors=stream.errors,
+                )
+            )
+            os.dup2(devnull, fd)
+        sys.stdout = sys.__stdout__ = kept[0]
+        sys.stderr = sys.__stderr__ = kept[1]
+        yield
+    finally:
+        if _sink is not None:
+            # Whatever the library still writes goes to /dev/null too
+            _sink.flush(FLUSH_TIMEOUT)
+        for fd, stream in enumerate(kept, 1):
+            stream.flush()
+            os.dup2(stream.fileno(), fd)
+            stream.close()
+        os.close(devnull)
+        sys.stdout, sys.stderr, sys.__stdout__, sys.__stderr__ = saved
+
+
 def log_info(msg):
     # Use generic log for now as tui_start/ok/gen/fail are specific events
-    get_bridge().log("info", "TUI", msg)
+    get_sink().log("info", "TUI", msg)
 
 
 def log_error(msg):
-    get_bridge().log("error", "TUI", msg)
+    get_sink().log("error", "TUI", msg)
 
 
 def log_debug(msg):
-    get_bridge().log("debug", "TUI", msg)
+    get_sink().log("debug", "TUI", msg)
+
+
+def log_perf(fields):
+    """Logs one structured performance record as space-separated key=value pairs."""
+    get_sink().log("debug", "PERF", " ".join(f"{k}={v}" for k, v in fields.items()))
 
 
 def log_tui_start():
-    get_bridge().log_preset("tui_start")
+    get_sink().log_preset("tui_start")
 
 
 def log_tui_ok():
-    get_bridge().log_preset("tui_ok")
+    get_sink().log_preset("tui_ok")
 
 
 def log_tui_theme_ok():
-    get_bridge().log_preset("tui_theme_ok")
+    get_sink().log_preset("tui_theme_ok")
 
 
 def log_tui_pick_ok(color):
-    get_bridge().log_preset("tui_pick_ok", color)
+    get_sink().log_preset("tui_pick_ok", color)
 
 
 def log_tui_save_ok():
-    get_bridge().log_preset("tui_save_ok")
+    get_sink().log_preset("tui_save_ok")
 
 
 def log_tui_gen(msg):
-    get_bridge().log_preset("tui_gen", msg)
+    get_sink().log_preset("tui_gen", msg)
 
 
 def log_tui_fail(msg):
-    get_bridge().log_preset("tui_fail", msg)
+    get_sink().log_preset("tui_fail", msg)
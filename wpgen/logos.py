@@ -0,0 +1,114 @@
+"""
+Decode-once cache for logo images.
+
+Logos are decoded to RGBA once per file version (path, size and mtime) and
+kept together with their scaled variants. Downscaled variants are derived
+from a mip chain of successive halvings, so a logo drawn at many sizes is
+only ever resampled from the nearest larger level instead of the full
+original. Memory is bounded by an LRU over the decoded bytes.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _nbytes(img):
+    return img.width * img.height * 4
+
+
+class LogoCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (file key, size or level) -> image
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+            return img
+
+    def _put(self, key, img):
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = img
+            self._bytes += _nbytes(img)
+            # The newest entry always stays, even if it alone is over budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= _nbytes(old)
+            return img
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def load(self, path):
+        """
+        Returns the decoded RGBA logo at path. Raises OSError if it cannot
+        be read. The returned image is shared; callers must not modify it.
+        """
+        return self._level(self._file_key(path), path, 0)
+
+    def get(self, path, scale=1.0):
+        """
+        Returns the logo at path resized by scale (at least 1x1 pixel),
+        cached per file version and target size.
+        """
+        file_key = self._file_key(path)
+        original = self._level(file_key, path, 0)
+        size = (
+            max(1, round(original.width * scale)),
+            max(1, round(original.height * scale)),
+        )
+        if size == original.size:
+            return original
+
+        img = self._get((file_key, size))
+        if img is not None:
+            return img
+
+        # Resample from the smallest mip level still at least as large
+        source = original
+        level = 1
+        while source.width // 2 >= size[0] and source.height // 2 >= size[1]:
+            source = self._level(file_key, path, level)
+            level += 1
+        img = source.resize(size, Image.Resampling.LANCZOS)
+        return self._put((file_key, size), img)
+
+    def _file_key(self, path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def _level(self, file_key, path, level):
+        key = (file_key, ("mip", level))
+        img = self._get(key)
+        if img is not None:
+            return img
+        if level == 0:
+            with Image.open(path) as f:
+                img = f.convert("RGBA")
+        else:
+            img = self._level(file_key, path, level - 1).reduce(2)
+        return self._put(key, img)
+
+
+# Global instance
+_cache = None
+
+
+def get_logo_cache():
+    global _cache
+    if _cache is None:
+        _cache = LogoCache()
+    return _cache
@@ -0,0 +1,252 @@
+"""
+Low-memory rendering (config 'low_memory').
+
+The standard pipeline hands a new full-size image from stage to stage, and
+several stages hold float copies of the whole frame on the way: classic
+noise alone keeps the frame, a float32 copy of it, the float32 noise and
+their sum. Here the frame is one uint8 array that every stage overwrites
+in place, BAND_ROWS rows at a time, so besides the frame only one band's
+temporaries are alive. Blur and sharpness read rows around each pixel;
+the original rows a band still needs from the band above are carried
+over before that band is overwritten. Stages run on the calling thread;
+config 'threads' does not apply.
+
+The output is identical to the standard pipeline's, classic noise
+included: it is drawn from the same stream, one band after another. Mesh
+backgrounds are upscaled in column strips rather than row bands (see
+fill_mesh), as resampling row bands rounds some pixels differently.
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from wpgen import dither, encoders, generator, grain
+from wpgen.instrument import span
+from wpgen.logos import get_logo_cache
+from wpgen.tiled import background_rows, blur_halo
+
+BAND_ROWS = 128
+
+# Columns per strip of the mesh upscale; a multiple of the dither tile, so
+# every strip starts on a tile boundary like the frame does
+COLUMN_STRIP = 4 * dither.DITHER_TILE
+
+
+def fill_mesh(frame, config, rng=None):
+    """
+    Draws the mesh background of config into frame, exactly as
+    generator.create_background does. PIL resizes horizontally first, then
+    vertically. The horizontal pass is only as tall as the reduced canvas
+    and runs whole; the vertical pass runs per strip of COLUMN_STRIP
+    columns, each strip resized with the coefficients of the full resize.
+    """
+    height, width = frame.shape[:2]
+    precise = bool(config.get("dither"))
+    canvas = generator.mesh_engine(config)(
+        width,
+        height,
+        config.get("colors", ["#000000"]),
+        config.get("mesh_blob_count"),
+        config.get("mesh_blur_intensity", 1.0),
+        config.get("mesh_blob_size", "medium"),
+        rng,
+        precise,
+    )
+    planes = [Image.fromarray(plane, "F") for plane in canvas] if precise else [canvas]
+    bicubic = Image.Resampling.BICUBIC
+    wide = [plane.resize((width, plane.height), bicubic) for plane in planes]
+    for left in range(0, width, COLUMN_STRIP):
+        right = min(width, left + COLUMN_STRIP)
+        strips = [
+            np.asarray(
+                plane.crop((left, 0, right, plane.height)).resize(
+                    (right - left, height), bicubic
+                )
+            )
+            for plane in wide
+        ]
+        if not precise:
+            frame[:, left:right] = strips[0]
+            continue
+        fixed = np.empty((height, right - left, 3), dtype=np.uint16)
+        for channel, strip in enumerate(strips):
+            fixed[..., channel] = dither.to_fixed(strip)
+        frame[:, left:right] = dither.quantize(fixed)
+
+
+def fill_background(frame, config, rng=None):
+    """Draws the background of config into frame, a (height, width, 3) array."""
+    height, width = frame.shape[:2]
+    mode = config.get("mode", "solid")
+    if mode == "animated":
+        frame[...] = np.asarray(generator.create_background(width, height, config, rng))
+        return
+    if mode == "gradient_mesh":
+        fill_mesh(frame, config, rng)
+        return
+    draw = background_rows(width, height, config, rng)
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(height, top + BAND_ROWS)
+        frame[top:bottom] = np.asarray(draw(top, bottom))
+
+
+def add_noise(frame, intensity, rng=None):
+    """
+    In-place generator.apply_noise: the noise is drawn band by band from
+    rng, which yields the same values as one full-frame draw.
+    """
+    rng = rng or np.random
+    width = frame.shape[1]
+    for top in range(0, frame.shape[0], BAND_ROWS):
+        band = frame[top : top + BAND_ROWS]
+        noise = rng.normal(0, 255 * intensity, (len(band), width, 3))
+        values = band.astype(np.float32)
+        values += noise.astype(np.float32)
+        del noise
+        np.clip(values, 0, 255, out=values)
+        band[...] = values
+
+
+def filter_rows(frame, func, halo=0):
+    """
+    Replaces frame in place with func(image), band by band. func must only
+    read up to halo rows above and below each pixel; the band is passed
+    with those rows in their original state.
+    """
+    height = frame.shape[0]
+    # The last halo original rows above the current band
+    carried = frame[:0].copy()
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(height, top + BAND_ROWS)
+        below = min(height, bottom + halo)
+        strip = np.concatenate((carried, frame[top:below]))
+        out = np.asarray(func(Image.fromarray(strip)))
+        start, end = len(carried), len(carried) + bottom - top
+        carried = strip[max(0, end - halo) : end].copy()
+        frame[top:bottom] = out[start:end]
+
+
+def adjust_colors(frame, brightness, contrast, saturation):
+    """In-place generator.adjust_colors, with the mean taken band by band."""
+    mean = None
+    if contrast != 1.0:
+        # The mean of the brightened frame, as adjust_colors takes it
+        hist = np.zeros(256, dtype=np.int64)
+        for top in range(0, frame.shape[0], BAND_ROWS):
+            strip = Image.fromarray(frame[top : top + BAND_ROWS])
+            strip = generator.adjust_colors(strip, brightness)
+            hist += strip.convert("L").histogram()
+        mean = generator.histogram_mean(hist.tolist())
+    filter_rows(
+        frame,
+        lambda strip: generator.adjust_colors(
+            strip, brightness, contrast, saturation, mean
+        ),
+    )
+
+
+def paste_logo(frame, config):
+    """Composites the logo of config onto frame, touching only its rows."""
+    height, width = frame.shape[:2]
+    scale, padding = generator.logo_placement(config, height)
+    try:
+        logo = get_logo_cache().get(config["logo_path"], scale)
+    except Exception:
+        # Same as composite_logo: a broken logo is skipped
+        return
+    x, y = generator.logo_origin(
+        (width, height), logo.size, config.get("position", "center"), padding
+    )
+    top, bottom = max(0, y), min(height, y + logo.height)
+    if top >= bottom:
+        return
+    strip = Image.fromarray(frame[top:bottom])
+    strip.paste(logo, (x, y - top), logo)
+    frame[top:bottom] = np.asarray(strip)
+
+
+def render_frame(width, height, config, rngs=None, recorder=None):
+    """
+    Runs the full pipeline for a single resolution on one working buffer
+    and returns it as a (height, width, 3) uint8 array.
+    """
+    rng, np_rng = rngs or generator.make_rngs(config.get("seed", 42))
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    with span(recorder, "background", width, height):
+        fill_background(frame, config, rng)
+
+    noise_level = config.get("noise", 0)
+    if noise_level > 0:
+        with span(recorder, "noise", width, height):
+            if generator.noise_engine(config) == "grain":
+                texture = grain.grain_texture(
+                    config.get("seed", 42),
+                    noise_level,
+                    config.get("noise_mono", False),
+                )
+                grain.apply_grain(frame, texture)
+            else:
+                add_noise(frame, noise_level, np_rng)
+
+    blur_radius = config.get("blur", 0)
+    if blur_radius > 0:
+        with span(recorder, "blur", width, height):
+            filter_rows(
+                frame,
+                lambda strip: generator.apply_blur(strip, blur_radius),
+                blur_halo(blur_radius),
+            )
+
+    if generator.has_color_adjustments(config):
+        with span(recorder, "color", width, height):
+            adjust_colors(
+                frame,
+                config.get("brightness", 1.0),
+                config.get("contrast", 1.0),
+                config.get("saturation", 1.0),
+            )
+
+    sharpness = config.get("sharpness", 1.0)
+    if sharpness != 1.0:
+        with span(recorder, "sharpness", width, height):
+            # Sharpness blends with a 3x3 smoothing filter
+            filter_rows(
+                frame, lambda strip: generator.apply_sharpness(strip, sharpness), 1
+            )
+
+    if config.get("logo_path"):
+        with span(recorder, "logo", width, height):
+            paste_logo(frame, config)
+    return frame
+
+
+def render_low_memory(width, height, config, rngs=None, recorder=None):
+    """Returns render_frame's result as an image."""
+    return Image.fromarray(render_frame(width, height, config, rngs, recorder))
+
+
+def save_low_memory(width, height, config, rngs=None, recorder=None):
+    """
+    Renders a single resolution with render_frame and saves it. PNG output
+    is streamed from the working buffer band by band (see wpgen.pngstream);
+    other formats are encoded from an image converted from it, after which
+    the buffer is dropped. Returns an EncodeResult.
+    """
+    frame = render_frame(width, height, config, rngs, recorder)
+    with span(recorder, "encode", width, height):
+        if config.get("format", "png") != "png":
+            img = Image.fromarray(frame)
+            del frame
+            return generator.save_wallpaper(img, config)
+        filename = generator.output_path(config, width, height)
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        return encoders.encode_stream(
+            (frame[top : top + BAND_ROWS] for top in range(0, height, BAND_ROWS)),
+            filename,
+            width,
+            height,
+            config.get("preset", "balanced"),
+            config.get("encoder_options"),
+        )
@@ -0,0 +1,230 @@
+"""
+Theme packs: every wallpaper a set of colours can make.
+
+A pack renders all solids, all ordered pairs of distinct colours in every
+gradient direction and all ordered triples of distinct colours with every
+mesh blob size. Combinations are enumerated lazily and configs that would
+render the same image as another one (repeated colours, which give a solid
+or a smaller combination) are skipped, so a 16-colour theme's ~11,000 jobs
+never exist as a list.
+
+Every job renders into its own directory under the pack directory, named
+after its config (e.g. linear_radial_1e1e2e_cba6f7). Finished jobs are
+appended to a journal (.wpgen-pack.jsonl) as they complete; a rerun skips
+every job the journal lists, so an interrupted pack resumes where it
+stopped.
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+
+from wpgen import generator, parallel
+
+DIRECTIONS = ("vertical", "horizontal", "diagonal_tl_br", "diagonal_tr_bl", "radial")
+MESH_SIZES = ("small", "medium", "large")
+MODES = ("solid", "linear", "mesh")
+
+JOURNAL = ".wpgen-pack.jsonl"
+
+# Seconds between progress lines
+REPORT_INTERVAL = 5.0
+
+
+def normalize_colors(colors):
+    """Returns colors as lowercase "#rrggbb" strings with duplicates removed."""
+    normalized = []
+    for color in colors:
+        value = color.strip().lower()
+        if not value.startswith("#"):
+            value = "#" + value
+        if len(value) == 4:
+            value = "#" + "".join(c * 2 for c in value[1:])
+        if len(value) != 7:
+            raise ValueError(f"Invalid colour: {color!r}")
+        try:
+            int(value[1:], 16)
+        except ValueError:
+            raise ValueError(f"Invalid colour: {color!r}") from None
+        if value not in normalized:
+            normalized.append(value)
+    return normalized
+
+
+def pack_size(count, modes=MODES, directions=DIRECTIONS, mesh_sizes=MESH_SIZES):
+    """Number of jobs of a pack of count distinct colours."""
+    size = 0
+    if "solid" in modes:
+        size += count
+    if "linear" in modes:
+        size += count * (count - 1) * len(directions)
+    if "mesh" in modes:
+        size += count * (count - 1) * (count - 2) * len(mesh_sizes)
+    return size
+
+
+def iter_pack(colors, modes=MODES, directions=DIRECTIONS, mesh_sizes=MESH_SIZES):
+    """
+    Yields (name, config) for every job of the pack of colors, which must
+    be distinct (see normalize_colors). Configs hold only the keys that
+    differ between jobs.
+    """
+    if "solid" in modes:
+        for color in colors:
+            yield f"solid_{color[1:]}", {"mode": "solid", "colors": [color]}
+
+    # permutations() never repeats a colour, which skips the pairs that
+    # would render a solid and the triples that would render a pair
+    if "linear" in modes:
+        for pair in itertools.permutations(colors, 2):
+            for direction in directions:
+                name = "_".join(["linear", direction] + [c[1:] for c in pair])
+                yield name, {
+                    "mode": "gradient_linear",
+                    "colors": list(pair),
+                    "gradient_direction": direction,
+                }
+
+    if "mesh" in modes:
+        for triple in itertools.permutations(colors, 3):
+            for size in mesh_sizes:
+                name = "_".join(["mesh", size] + [c[1:] for c in triple])
+                yield name, {
+                    "mode": "gradient_mesh",
+                    "colors": list(triple),
+                    "mesh_blob_size": size,
+                }
+
+
+def read_journal(path):
+    """
+    Returns the pack settings recorded in a journal and the names of its
+    finished jobs, or (None, set()) without a journal. A line cut short by
+    an interrupted write is ignored.
+    """
+    settings = None
+    finished = set()
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return None, finished
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "pack" in entry:
+                settings = entry["pack"]
+            elif "error" not in entry:
+                finished.add(entry["name"])
+    return settings, finished
+
+
+def run_pack(
+    colors,
+    output_dir,
+    defaults=None,
+    modes=MODES,
+    directions=DIRECTIONS,
+    mesh_sizes=MESH_SIZES,
+    workers=None,
+    memory_budget=None,
+    low_memory=False,
+):
+    """
+    Renders the pack of colors into output_dir on a process pool, resuming
+    from its journal. defaults holds the config keys shared by every job
+    (resolutions, noise, format, ...). memory_budget caps the estimated
+    peak RSS of the renders running at once (see parallel.iter_results)
+    and low_memory renders every job in place on one frame buffer; neither
+    is recorded, so a pack may resume with different ones. Raises
+    ValueError if output_dir holds the journal of a different pack.
+    Returns the number of failed render tasks.
+    """
+    colors = normalize_colors(colors)
+    defaults = dict(defaults or {})
+    settings = {
+        "colors": colors,
+        "modes": list(modes),
+        "directions": list(directions),
+        "mesh_sizes": list(mesh_sizes),
+        "defaults": defaults,
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    journal_path = os.path.join(output_dir, JOURNAL)
+    recorded, finished = read_journal(journal_path)
+    if recorded is not None and recorded != json.loads(json.dumps(settings)):
+        raise ValueError(
+            f"{output_dir} holds a different pack; use another directory "
+            f"or remove {JOURNAL} to start over"
+        )
+
+    total = pack_size(len(colors), modes, directions, mesh_sizes)
+    skipped = 0
+    # Job number -> [name, unfinished tasks, failed]
+    in_flight = {}
+    submitted = 0
+
+    def configs():
+        nonlocal skipped, submitted
+        for name, job in iter_pack(colors, modes, directions, mesh_sizes):
+            if name in finished:
+                skipped += 1
+                continue
+            config = {**defaults, **job}
+            config["output_dir"] = os.path.join(output_dir, name)
+            # The pool already runs jobs in parallel
+            config["workers"] = 1
+            if low_memory:
+                config["low_memory"] = True
+            tasks = len(generator.plan_tasks(config))
+            in_flight[submitted] = [name, tasks, False]
+            submitted += 1
+            yield config
+
+    done = failures = 0
+    start = last_report = time.perf_counter()
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        if recorded is None:
+            journal.write(json.dumps({"pack": settings}) + "\n")
+            journal.flush()
+
+        completed = parallel.iter_results(
+            configs(), workers, memory_budget=memory_budget
+        )
+        for result in completed:
+            job = in_flight[result.index]
+            job[1] -= 1
+            if result.error is not None:
+                failures += 1
+                job[2] = True
+                print(f"{job[0]}: {result.error}", file=sys.stderr)
+            if job[1]:
+                continue
+
+            del in_flight[result.index]
+            done += 1
+            entry = {"name": job[0]}
+            if job[2]:
+                entry["error"] = True
+            # One line per finished job; a crash loses at most the jobs
+            # in flight
+            journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL:
+                last_report = now
+                rate = done / (now - start)
+                print(f"{skipped + done}/{total} jobs ({rate:.2f} jobs/s)")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(
+        f"{done} jobs rendered, {skipped} already done, {failures} failed renders "
+        f"in {elapsed:.2f}s ({done / elapsed:.2f} jobs/s)"
+    )
+    return failures
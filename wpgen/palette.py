@@ -0,0 +1,116 @@
+"""
+Colour palettes extracted from images.
+
+An image is decoded at reduced size (JPEGs in draft mode, which lets the
+decoder skip most of the DCT work), downsampled to a fixed budget of
+SAMPLE_PIXELS pixels and clustered with MiniBatchKMeans under a bounded
+iteration count, so a 24-megapixel photo costs about as much as a
+thumbnail. Results are cached in memory and on disk
+(~/.cache/wpgen/palettes) by the file's content hash, so picking the same
+image again is instant.
+"""
+
+import json
+import os
+import threading
+import time
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from wpgen.cache import atomic_write, cache_root, file_hash
+
+# Pixels clustered per image, whatever its size
+SAMPLE_PIXELS = 64 * 1024
+
+# MiniBatchKMeans limits: passes over the sample and batch size
+MAX_ITER = 20
+BATCH_SIZE = 4096
+
+# Bump when the extraction changes, so stale cached palettes are ignored
+PALETTE_VERSION = 1
+
+_palettes = {}
+_lock = threading.Lock()
+
+
+class Palette(NamedTuple):
+    colors: list  # "#rrggbb" strings, most common first
+    seconds: float  # Extraction time; near zero when cached
+    cached: bool
+
+
+def default_palette_dir():
+    return cache_root() / "palettes"
+
+
+def load_sample(path, budget=SAMPLE_PIXELS):
+    """Returns up to about budget RGB pixels of the image at path as (N, 3) uint8."""
+    with Image.open(path) as img:
+        scale = min(1.0, (budget / (img.width * img.height)) ** 0.5)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        # JPEG only: decode at the smallest 1/2^n scale still >= size
+        img.draft("RGB", size)
+        img = img.convert("RGB")
+        if img.size != size:
+            img = img.resize(size, Image.Resampling.BOX)
+        return np.asarray(img).reshape(-1, 3)
+
+
+def cluster_colors(pixels, count, seed=0):
+    """Returns count "#rrggbb" cluster centres of pixels, largest cluster first."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    samples = pixels.astype(np.float32)
+    count = max(1, min(count, len(samples)))
+    kmeans = MiniBatchKMeans(
+        n_clusters=count,
+        batch_size=BATCH_SIZE,
+        max_iter=MAX_ITER,
+        n_init=1,
+        random_state=seed,
+    )
+    with warnings.catch_warnings():
+        # Images with fewer distinct colours than clusters still get a palette
+        warnings.simplefilter("ignore")
+        labels = kmeans.fit_predict(samples)
+    sizes = np.bincount(labels, minlength=count)
+    centres = np.clip(np.rint(kmeans.cluster_centers_), 0, 255).astype(int)
+    order = np.argsort(-sizes, kind="stable")
+    return ["#{:02x}{:02x}{:02x}".format(*centres[i]) for i in order]
+
+
+def extract_palette(path, count=3, directory=None):
+    """
+    Returns the Palette of count colours of the image at path. Raises
+    OSError if it cannot be read.
+    """
+    start = time.perf_counter()
+    key = f"{file_hash(path)}_{count}_v{PALETTE_VERSION}"
+    with _lock:
+        colors = _palettes.get(key)
+    if colors is None:
+        entry = os.path.join(directory or default_palette_dir(), f"{key}.json")
+        try:
+            with open(entry, encoding="utf-8") as f:
+                colors = json.load(f)
+        except (OSError, ValueError):
+            colors = None
+    if colors is not None:
+        with _lock:
+            _palettes[key] = colors
+        return Palette(list(colors), time.perf_counter() - start, True)
+
+    colors = cluster_colors(load_sample(path), count)
+    try:
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        with atomic_write(entry, "w", encoding="utf-8") as f:
+            json.dump(colors, f)
+    except OSError:
+        # A read-only cache only costs extracting again next session
+        pass
+    with _lock:
+        _palettes[key] = colors
+    return Palette(list(colors), time.perf_counter() - start, False)
@@ -0,0 +1,246 @@
+import contextlib
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from wpgen import generator
+from wpgen.instrument import PeakWindow, Recorder
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+# Estimated peak RSS of a worker before its first render: the interpreter,
+# NumPy, PIL and the generator
+WORKER_RSS = 48 << 20
+
+# Estimated peak RSS per output pixel on top of WORKER_RSS, by pipeline,
+# until a finished render of the same kind reports its actual peak. The
+# standard pipeline peaks at ~53 bytes per pixel with every effect on
+PIXEL_BYTES = {"standard": 64, "low_memory": 12, "tiled": 12, "animated": 64}
+
+
+def parse_size(value):
+    """
+    Parses a byte count given as an int or a string like "512M", "4G" or
+    "1.5GiB" (binary multiples). Raises ValueError for anything else.
+    """
+    if isinstance(value, int):
+        size = value
+    else:
+        text = str(value).strip().upper().removesuffix("B").removesuffix("I")
+        unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+        try:
+            size = int(float(text[: len(text) - len(unit)]) * SIZE_UNITS[unit])
+        except (ValueError, OverflowError):
+            raise ValueError(f"Invalid size: {value!r}") from None
+    if size <= 0:
+        raise ValueError(f"Size must be positive: {value!r}")
+    return size
+
+
+def memory_profile(config):
+    """
+    Returns the pipeline of config and the settings its peak memory depends
+    on; renders of the same profile peak at about the same bytes per pixel.
+    """
+    output = config.get("format", "png")
+    if config.get("mode") == "animated":
+        pipeline = "animated"
+        output = config.get("animation_format", "webp")
+    elif config.get("tile_rows") or config.get("stream"):
+        pipeline = "tiled"
+    elif config.get("low_memory") and not config.get("shared_base"):
+        pipeline = "low_memory"
+    else:
+        pipeline = "standard"
+    return (
+        pipeline,
+        config.get("mode", "solid"),
+        config.get("gradient_direction") == "radial",
+        config.get("noise", 0) > 0 and config.get("noise_engine", "grain"),
+        config.get("blur", 0) > 0,
+        generator.has_color_adjustments(config),
+        config.get("sharpness", 1.0) != 1.0,
+        bool(config.get("shared_base")),
+        output,
+    )
+
+
+def task_pixels(config, resolutions):
+    """Pixels of the largest frame a render task holds at a time."""
+    if config.get("shared_base") and config.get("mode") != "animated":
+        width, height = generator.covering_canvas(resolutions)
+        return width * height
+    return max(width * height for width, height in resolutions)
+
+
+class MemoryBudget:
+    """
+    Admits render tasks while the sum of their estimated peak RSS stays
+    within budget bytes. A task's estimate is WORKER_RSS plus its pixels
+    times the bytes per pixel of its memory profile: the largest observed
+    so far, or PIXEL_BYTES before any render of that profile finished.
+    One task is always admitted when none is running, however large.
+    """
+
+    def __init__(self, budget):
+        self.budget = parse_size(budget)
+        self.used = 0
+        # Memory profile -> observed bytes per pixel
+        self._rates = {}
+
+    def estimate(self, config, resolutions):
+        profile = memory_profile(config)
+        rate = self._rates.get(profile)
+        if rate is None:
+            rate = PIXEL_BYTES[profile[0]]
+            if profile[0] == "animated" and profile[-1] != "frames":
+                # webp and apng hold every encoded frame until the end
+                rate += 4 * int(config.get("frames", 60))
+        return WORKER_RSS + int(rate * task_pixels(config, resolutions))
+
+    def admit(self, estimate):
+        """Reserves estimate bytes if they fit and returns whether they did."""
+        if self.used and self.used + estimate > self.budget:
+            return False
+        self.used += estimate
+        return True
+
+    def release(self, estimate):
+        self.used -= estimate
+
+    def observe(self, config, resolutions, peak_rss):
+        """Learns the bytes per pixel of config's profile from a finished task."""
+        if peak_rss is None:
+            return
+        profile = memory_profile(config)
+        rate = max(0, peak_rss - WORKER_RSS) / task_pixels(config, resolutions)
+        self._rates[profile] = max(rate, self._rates.get(profile, 0))
+
+
+def _render(config, resolutions):
+    # Runs inside a worker process; the task seeds its own RNG streams
+    encodes = []
+    recorder = Recorder() if config.get("instrument") else None
+    try:
+        with PeakWindow() as window:
+            paths = generator.render_task(config, resolutions, encodes, recorder)
+    finally:
+        if recorder:
+            recorder.close()
+    return paths, encodes, recorder.records if recorder else None, window.peak
+
+
+def iter_results(configs, workers=None, max_pending=None, memory_budget=None):
+    """
+    Renders every task of every config on a process pool and yields a
+    RenderResult as each task completes, failed ones included.
+
+    configs may be any iterable (e.g. a generator reading a manifest): it
+    is consumed lazily, and at most max_pending tasks (default: twice the
+    worker count) are queued at any time, so memory stays flat no matter
+    how many configs are fed in.
+
+    memory_budget (bytes, or a size like "4G"; see MemoryBudget) further
+    holds back tasks while the estimated peak RSS of those already
+    submitted would not leave room for them. Tasks then only queue for an
+    idle worker (max_pending defaults to the worker count) and still start
+    in submission order.
+
+    A worker that dies (e.g. killed for running out of memory) fails the
+    tasks the pool held at the time; the remaining tasks go to a new pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    budget = MemoryBudget(memory_budget) if memory_budget else None
+    max_pending = max_pending or (workers if budget else workers * 2)
+    # spawn keeps workers independent of the caller's threads (e.g. the TUI)
+    context = multiprocessing.get_context("spawn")
+
+    tasks = (
+        (index, config, resolutions)
+        for index, config in enumerate(configs)
+        for resolutions in generator.plan_tasks(config)
+    )
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    pool = new_pool()
+    pending = {}
+    # The next task, held back until the budget has room for it
+    upcoming = None
+    try:
+        while True:
+            while len(pending) < max_pending:
+                upcoming = upcoming or next(tasks, None)
+                if upcoming is None:
+                    break
+                index, config, resolutions = upcoming
+                estimate = budget.estimate(config, resolutions) if budget else 0
+                if budget and not budget.admit(estimate):
+                    break
+                try:
+                    future = pool.submit(_render, config, resolutions)
+                except BrokenProcessPool:
+                    # The tasks it held fail through their futures below
+                    pool.shutdown(wait=False)
+                    pool = new_pool()
+                    future = pool.submit(_render, config, resolutions)
+                pending[future] = (index, config, resolutions, estimate)
+                upcoming = None
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, config, resolutions, estimate = pending.pop(future)
+                if budget:
+                    budget.release(estimate)
+                try:
+                    paths, encodes, stages, peak = future.result()
+                except Exception as e:
+                    yield generator.RenderResult(index, resolutions, [], e)
+                    continue
+                if budget:
+                    budget.observe(config, resolutions, peak)
+                yield generator.RenderResult(
+                    index, resolutions, paths, None, encodes, stages, peak
+                )
+    finally:
+        # Closed early (e.g. by a cancelled job): drop queued tasks
+        # instead of rendering them before the pool shuts down
+        for future in pending:
+            future.cancel()
+        pool.shutdown()
+
+
+def render_parallel(configs, workers=None, on_result=None, memory_budget=None):
+    """
+    Renders every task of every config on a process pool.
+
+    Args:
+        configs: list of generate_wallpaper config dicts
+        workers: number of worker processes (default: CPU count)
+        on_result: called with a RenderResult in the calling thread as
+            each task completes, including failed ones
+        memory_budget: peak RSS the running tasks may add up to (see
+            iter_results), or None for no limit
+
+    Returns the RenderResults in submission order. Errors are not raised
+    but reported through RenderResult.error.
+    """
+    results = []
+    # Closed explicitly, so an exception raised by on_result cancels the
+    # queued tasks right away
+    completed = iter_results(configs, workers, memory_budget=memory_budget)
+    with contextlib.closing(completed):
+        for result in completed:
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    def submission_order(result):
+        tasks = generator.plan_tasks(configs[result.index])
+        return result.index, tasks.index(result.resolutions)
+
+    return sorted(results, key=submission_order)
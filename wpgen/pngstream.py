@@ -0,0 +1,216 @@
+"""
+Strip-wise PNG encoder.
+
+PNGStreamWriter accepts an image as consecutive strips of rows and streams
+them through zlib into a standard 8-bit RGB PNG, so the full frame never
+has to exist in memory. Rows are filtered like PIL's encoder does: every
+row gets the PNG filter type (None, Sub, Up, Average, Paeth) with the
+smallest sum of absolute differences. Filtering and compression run on a
+background thread, so they overlap with rendering the next strip.
+"""
+
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Row filter types of the PNG specification
+FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+
+# Compressed bytes collected before an IDAT chunk is written
+CHUNK_BYTES = 1 << 18
+
+# Rows filtered at a time, bounding the filter scratch buffers
+FILTER_ROWS = 16
+
+# Strips queued for the background thread
+QUEUE_STRIPS = 2
+
+
+def _chunk(kind, data):
+    crc = zlib.crc32(data, zlib.crc32(kind))
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def filter_rows(rows, prior, filter_type="adaptive"):
+    """
+    Filters a (n, width * 3) uint8 array of raw rows whose predecessor is
+    prior (zeros for the first row of an image). Returns the filtered
+    rows, each prefixed with its filter type byte, as one byte string.
+    """
+    n, length = rows.shape
+    raw = rows.astype(np.int16)
+    # Neighbours: a = left, b = up, c = up-left (3 bytes per pixel)
+    up = np.empty_like(raw)
+    up[0] = prior
+    up[1:] = raw[:-1]
+    left = np.zeros_like(raw)
+    left[:, 3:] = raw[:, :-3]
+    up_left = np.zeros_like(raw)
+    up_left[:, 3:] = up[:, :-3]
+
+    candidates = {}
+    if filter_type in ("none", "adaptive"):
+        candidates[0] = raw
+    if filter_type in ("sub", "adaptive"):
+        candidates[1] = raw - left
+    if filter_type in ("up", "adaptive"):
+        candidates[2] = raw - up
+    if filter_type in ("average", "adaptive"):
+        candidates[3] = raw - ((left + up) >> 1)
+    if filter_type in ("paeth", "adaptive"):
+        p = left + up - up_left
+        pa = np.abs(p - left)
+        pb = np.abs(p - up)
+        pc = np.abs(p - up_left)
+        predictor = np.where(
+            (pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left)
+        )
+        candidates[4] = raw - predictor
+    if not candidates:
+        raise ValueError(f"Unknown PNG filter: {filter_type}")
+
+    types = list(candidates)
+    out = np.empty((n, length + 1), dtype=np.uint8)
+    if len(types) == 1:
+        out[:, 0] = types[0]
+        out[:, 1:] = candidates[types[0]]
+        return out.tobytes()
+
+    # Minimum sum of absolute values, reading the filtered bytes as signed
+    costs = np.empty((len(types), n), dtype=np.int64)
+    for i, t in enumerate(types):
+        signed = ((candidates[t] + 128) & 0xFF) - 128
+        costs[i] = np.abs(signed, out=signed).sum(axis=1)
+    choice = costs.argmin(axis=0)
+    for row, i in enumerate(choice):
+        out[row, 0] = types[i]
+        out[row, 1:] = candidates[types[i]][row]
+    return out.tobytes()
+
+
+class PNGStreamWriter:
+    """
+    Writes a width x height RGB PNG to a binary file object strip by
+    strip. Call write() with uint8 arrays of shape (rows, width, 3) (or
+    RGB PIL images) from top to bottom, then close(). Also usable as a
+    context manager, which closes on success.
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        width,
+        height,
+        level=6,
+        strategy=zlib.Z_DEFAULT_STRATEGY,
+        filter_type="adaptive",
+    ):
+        if filter_type != "adaptive" and filter_type not in FILTERS:
+            raise ValueError(f"Unknown PNG filter: {filter_type}")
+        self.fileobj = fileobj
+        self.width = width
+        self.height = height
+        self.filter_type = filter_type
+        self.rows_written = 0
+        self.seconds = 0.0  # CPU time spent filtering and compressing
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+        self._pending = []
+        self._pending_bytes = 0
+        self._prior = np.zeros(width * 3, dtype=np.int16)
+        self._error = None
+        self._queue = queue.Queue(QUEUE_STRIPS)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        fileobj.write(PNG_SIGNATURE + _chunk(b"IHDR", ihdr))
+        self._thread.start()
+
+    def write(self, strip):
+        """Queues the next strip of rows for filtering and compression."""
+        strip = np.asarray(strip, dtype=np.uint8)
+        if strip.ndim != 3 or strip.shape[1:] != (self.width, 3):
+            raise ValueError(
+                f"Expected a strip of shape (rows, {self.width}, 3), got {strip.shape}"
+            )
+        if self.rows_written + len(strip) > self.height:
+            raise ValueError("More rows written than the image height")
+        self._raise_error()
+        self.rows_written += len(strip)
+        self._queue.put(strip)
+
+    def close(self):
+        """Flushes all queued rows and writes the final chunks."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+        if self.rows_written != self.height:
+            raise ValueError(
+                f"Wrote {self.rows_written} of {self.height} rows before closing"
+            )
+        self._emit(self._compressor.flush())
+        self._flush_idat()
+        self.fileobj.write(_chunk(b"IEND", b""))
+
+    def abort(self):
+        """Stops the background thread without finishing the file."""
+        self._error = self._error or RuntimeError("aborted")
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            strip = self._queue.get()
+            if strip is None:
+                return
+            if self._error is not None:
+                # Keep draining so producers never block on a dead writer
+                continue
+            start = time.thread_time()
+            try:
+                self._encode(strip)
+            except BaseException as e:
+                self._error = e
+            self.seconds += time.thread_time() - start
+
+    def _encode(self, strip):
+        rows = strip.reshape(len(strip), -1)
+        for start in range(0, len(rows), FILTER_ROWS):
+            block = rows[start : start + FILTER_ROWS]
+            self._emit(
+                self._compressor.compress(
+                    filter_rows(block, self._prior, self.filter_type)
+                )
+            )
+            self._prior = block[-1].astype(np.int16)
+
+    def _emit(self, data):
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= CHUNK_BYTES:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self._pending:
+            self.fileobj.write(_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending = []
+            self._pending_bytes = 0
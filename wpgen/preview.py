@@ -0,0 +1,70 @@
+import numpy as np
+from PIL import Image
+from rich.color import Color, ColorType
+from rich.color_triplet import ColorTriplet
+from rich.segment import Segment
+from rich.style import Style
+
+UPPER_HALF_BLOCK = "▀"
+
+
+def fit_size(width, height, cols, rows):
+    """
+    Size a width x height image takes in a cols x rows cell area at two
+    pixels per cell (terminal cells are about twice as tall as wide, so
+    pixels stay square).
+    """
+    scale = min(cols / width, rows * 2 / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_to_cells(img, cols, rows):
+    """Resizes img to fit_size, the pixels a cols x rows cell area shows."""
+    size = fit_size(img.width, img.height, cols, rows)
+    if size == img.size:
+        return img
+    return img.resize(size, Image.Resampling.BILINEAR)
+
+
+class HalfBlockImage:
+    """
+    Rich renderable drawing an RGB image with upper half blocks: the
+    foreground colour paints the top pixel of a cell, the background
+    colour the bottom one. Segments are built up front so that rendering
+    on the UI thread only replays them; a run of equal cells is one
+    segment, and each colour and colour pair is built once.
+    """
+
+    def __init__(self, img):
+        pixels = np.asarray(img.convert("RGB"), dtype=np.uint64)
+        if len(pixels) % 2:
+            pixels = np.concatenate((pixels, pixels[-1:]))
+        packed = pixels[..., 0] << 16 | pixels[..., 1] << 8 | pixels[..., 2]
+        cells = packed[0::2] << 24 | packed[1::2]
+
+        colors = {}
+        styles = {}
+
+        def color(rgb):
+            if rgb not in colors:
+                # What Color.from_rgb builds, without its detours
+                triplet = ColorTriplet(rgb >> 16, rgb >> 8 & 0xFF, rgb & 0xFF)
+                colors[rgb] = Color(f"#{rgb:06x}", ColorType.TRUECOLOR, triplet=triplet)
+            return colors[rgb]
+
+        self.segments = []
+        for row in cells:
+            starts = np.flatnonzero(row[1:] != row[:-1]) + 1
+            bounds = [0, *starts.tolist(), len(row)]
+            for start, end in zip(bounds, bounds[1:]):
+                # The top pixel's 0xRRGGBB above the bottom pixel's
+                cell = int(row[start])
+                style = styles.get(cell)
+                if style is None:
+                    style = Style.from_color(color(cell >> 24), color(cell & 0xFFFFFF))
+                    styles[cell] = style
+                self.segments.append(Segment(UPPER_HALF_BLOCK * (end - start), style))
+            self.segments.append(Segment.line())
+
+    def __rich_console__(self, console, options):
+        yield from self.segments
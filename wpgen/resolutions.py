@@ -0,0 +1,39 @@
+"""
+Output resolution sets. Kept free of heavy imports, so the CLI and the TUI
+can validate resolutions without loading the renderer.
+"""
+
+RESOLUTIONS = [(1920, 1080), (2560, 1440), (1920, 1200)]
+
+# Largest edge accepted for a single output
+MAX_DIMENSION = 16384
+
+
+def parse_resolutions(value):
+    """
+    Parses a resolution set given as "1920x1080, 3440x1440" or as a list of
+    "WxH" strings and/or [width, height] pairs. Returns a list of
+    (width, height) tuples with duplicates removed, in the given order.
+    None or an empty value yields RESOLUTIONS. Raises ValueError for
+    anything that is not a positive size up to MAX_DIMENSION.
+    """
+    if not value:
+        return list(RESOLUTIONS)
+    if isinstance(value, str):
+        value = [part for part in value.replace(";", ",").split(",") if part.strip()]
+
+    resolutions = []
+    for item in value:
+        try:
+            if isinstance(item, str):
+                width, height = item.lower().split("x")
+            else:
+                width, height = item
+            size = (int(width), int(height))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid resolution: {item!r}") from None
+        if not all(0 < edge <= MAX_DIMENSION for edge in size):
+            raise ValueError(f"Resolution out of range: {size[0]}x{size[1]}")
+        if size not in resolutions:
+            resolutions.append(size)
+    return resolutions
@@ -0,0 +1,258 @@
+"""
+Long-lived render server ('wpgen serve').
+
+A fresh wpgen process pays for Python start-up and for importing PIL and
+NumPy before it draws a pixel, which costs more than most renders. The
+server pays that once and keeps it warm, together with everything the
+generator caches in memory (grain textures, decoded logos, file hashes).
+
+Protocol: newline-delimited JSON over a Unix domain socket. Every request
+line is an object
+
+    {"id": any, "config": {...}}   # a generate_wallpaper config
+    {"id": any, "op": "ping"}      # server status
+
+where output_dir must be an absolute path (the server's working directory
+is not the client's), and is answered by one line echoing its id:
+
+    {"id": ..., "ok": true, "paths": [...], "seconds": s, "queued": s,
+     "results": [{"resolutions": ["WxH"], "paths": [...], "encode_seconds": s,
+                  "peak_rss": bytes}]}
+    {"id": ..., "ok": false, "error": "ValueError: ..."}
+
+peak_rss is the peak RSS of the server process while the render ran,
+requests rendering alongside it included (null where it cannot be
+measured).
+
+A connection may send any number of requests; answers arrive in completion
+order. Renders wait in a bounded queue for one of the worker threads. When
+the queue is full a request is answered with error "busy" at once instead
+of piling up. See wpgen.client for the client side.
+"""
+
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from wpgen import generator
+from wpgen.client import default_socket_path
+
+DEFAULT_QUEUE = 16
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def render_request(config):
+    """Renders config and returns the response fields of a successful render."""
+    results = []
+    start = time.perf_counter()
+    # The server's threads already render requests in parallel
+    paths = generator.generate_wallpaper(dict(config, workers=1), results.append)
+    return {
+        "paths": paths,
+        "seconds": time.perf_counter() - start,
+        "results": [
+            {
+                "resolutions": [f"{w}x{h}" for w, h in result.resolutions],
+                "paths": result.paths,
+                "encode_seconds": sum(e.seconds for e in result.encodes or []),
+                "peak_rss": result.peak_rss,
+            }
+            for result in results
+        ],
+    }
+
+
+def warm_up():
+    """Runs a tiny render so the first request does not pay for lazy set-up."""
+    with tempfile.TemporaryDirectory() as tmp:
+        render_request(
+            {
+                "mode": "gradient_mesh",
+                "colors": ["#1e1e2e", "#cba6f7", "#89b4fa"],
+                "resolutions": ["64x64"],
+                "cache": False,
+                "output_dir": tmp,
+            }
+        )
+
+
+class _Connection(socketserver.StreamRequestHandler):
+    def handle(self):
+        self._write_lock = threading.Lock()
+        self._outstanding = 0
+        self._idle = threading.Condition()
+
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+            if not line:
+                break
+            if len(line) > MAX_REQUEST_BYTES:
+                self._send({"id": None, "ok": False, "error": "Request too long"})
+                break
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+            except ValueError as e:
+                error = f"Invalid request: {e}"
+                self._send({"id": None, "ok": False, "error": error})
+                continue
+
+            with self._idle:
+                self._outstanding += 1
+            self.server.submit(request, self._reply)
+
+        # Answer everything this connection submitted before closing it
+        with self._idle:
+            self._idle.wait_for(lambda: self._outstanding == 0)
+
+    def _reply(self, response):
+        self._send(response)
+        with self._idle:
+            self._outstanding -= 1
+            self._idle.notify_all()
+
+    def _send(self, response):
+        data = json.dumps(response).encode("utf-8") + b"\n"
+        with self._write_lock:
+            try:
+                self.wfile.write(data)
+            except OSError:
+                pass  # The client went away; the render's files still exist
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Accepts requests on a Unix socket and renders them on a pool of worker
+    threads fed by a bounded queue.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path=None, threads=None, queue_size=DEFAULT_QUEUE):
+        self.path = path or default_socket_path()
+        self.threads = threads or os.cpu_count() or 1
+        self.jobs = queue.Queue(queue_size)
+        self.served = 0
+        self._workers = []
+        _claim_socket(self.path)
+        super().__init__(self.path, _Connection)
+        # Renders write wherever a request asks; only the owner may ask
+        os.chmod(self.path, 0o600)
+
+    def submit(self, request, reply):
+        request_id = request.get("id")
+        op = request.get("op", "render")
+        if op == "ping":
+            reply(
+                {
+                    "id": request_id,
+                    "ok": True,
+                    "pid": os.getpid(),
+                    "threads": self.threads,
+                    "queued": self.jobs.qsize(),
+                    "served": self.served,
+                }
+            )
+            return
+        config = request.get("config")
+        if op != "render" or not isinstance(config, dict):
+            reply({"id": request_id, "ok": False, "error": f"Invalid request: {op}"})
+            return
+        output_dir = config.get("output_dir")
+        if not isinstance(output_dir, str) or not os.path.isabs(output_dir):
+            error = "Invalid request: output_dir must be an absolute path"
+            reply({"id": request_id, "ok": False, "error": error})
+            return
+        try:
+            self.jobs.put_nowait((request_id, config, time.perf_counter(), reply))
+        except queue.Full:
+            reply({"id": request_id, "ok": False, "error": "busy"})
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            request_id, config, submitted, reply = job
+            queued = time.perf_counter() - submitted
+            try:
+                response = render_request(config)
+            except Exception as e:
+                print(f"{request_id}: {e}", file=sys.stderr)
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            else:
+                response["ok"] = True
+                print(
+                    f"{request_id}: {len(response['paths'])} files in "
+                    f"{response['seconds']:.2f}s (queued {queued:.2f}s)",
+                    file=sys.stderr,
+                )
+            self.served += 1
+            reply({"id": request_id, "queued": queued, **response})
+
+    def start_workers(self):
+        for _ in range(self.threads):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop_workers(self):
+        """Lets the workers finish every queued render, then stops them."""
+        for _ in self._workers:
+            self.jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _claim_socket(path):
+    """Removes a stale socket file at path, or raises if a server still owns it."""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(path)
+            return
+    raise RuntimeError(f"A server is already listening on {path}")
+
+
+def serve(path=None, threads=None, queue_size=DEFAULT_QUEUE):
+    """Runs the render server until SIGINT or SIGTERM."""
+    server = RenderServer(path, threads, queue_size)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        warm_up()
+        server.start_workers()
+        print(
+            f"Listening on {server.path} ({server.threads} threads, "
+            f"queue of {queue_size})",
+            file=sys.stderr,
+        )
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Stop accepting first so nothing new arrives while the queue drains
+        server.server_close()
+        server.stop_workers()
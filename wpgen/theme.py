@@ -0,0 +1,56 @@
+"""
+The Kitchn theme, as rendered into ~/.config/wpgen/tui_theme_config.py by
+`kitchn stock wp-gen-tui.ing`.
+"""
+
+import sys
+from pathlib import Path
+
+# Theme variables holding colours, in the order packs use them
+THEME_COLORS = (
+    "BG",
+    "FG",
+    "PRIMARY",
+    "SECONDARY",
+    "ACCENT",
+    "PANEL",
+    "SUCCESS",
+    "WARNING",
+    "ERROR",
+    "INFO",
+)
+
+
+def load_theme_config():
+    """
+    Imports the Kitchn-generated ~/.config/wpgen/tui_theme_config.py.
+    Returns the module, or None if it is missing or cannot be imported.
+    """
+    config_path = Path.home() / ".config" / "wpgen"
+    if not (config_path / "tui_theme_config.py").exists():
+        return None
+    sys.path.insert(0, str(config_path))
+    try:
+        import tui_theme_config
+
+        return tui_theme_config
+    except ImportError:
+        return None
+    finally:
+        sys.path.pop(0)
+
+
+def theme_colors(theme=None):
+    """
+    Returns the distinct colours of a theme module (default: the installed
+    theme) as lowercase "#rrggbb" strings, or an empty list without one.
+    """
+    theme = theme or load_theme_config()
+    colors = []
+    for name in THEME_COLORS:
+        value = getattr(theme, name, None)
+        if isinstance(value, str) and value.startswith("#"):
+            value = value.lower()
+            if value not in colors:
+                colors.append(value)
+    return colors
@@ -10,32 +10,27 @@ from textual.widgets import (
     Switch,
     Select,
     Log,
+    ProgressBar,
+    Static,
 )
 from textual.validation import Regex
 from textual.theme import Theme
+from textual.worker import get_current_worker
 import os
-import sys
 import subprocess
-from pathlib import Path
-from wpgen import generator, kitchn_bridge
-
-# Try to load theme config from XDG config directory
-HAS_THEME = False
-tui_theme_config = None
-config_path = Path.home() / ".config" / "wpgen"
-if (config_path / "tui_theme_config.py").exists():
-    sys.path.insert(0, str(config_path))
-    try:
-        import tui_theme_config
-        HAS_THEME = True
-    except ImportError:
-        pass
-    finally:
-        sys.path.pop(0)
+from wpgen import kitchn_bridge, resolutions
+from wpgen.theme import load_theme_config
+from wpgen.jobs import Job, RenderCancelled
+
+# The renderer (generator, preview, instrument, palette) pulls in NumPy and
+# PIL; it is imported where a render starts, so the window comes up without
+# waiting for it.
 
-if not HAS_THEME:
-    print("Warning: tui_theme_config not found in ~/.config/wpgen/")
-    print("Run: kitchn stock wp-gen-tui.ing")
+# Seconds of input quiet before the preview re-renders
+PREVIEW_DEBOUNCE = 0.15
+# Preview passes, as shares of the pixels the preview pane shows (two per
+# cell): a coarse frame right away, then one at the pane's full resolution
+PREVIEW_PASSES = (1 / 4, 1)
 
 
 class WallpaperGenApp(App):
@@ -46,29 +41,6 @@ class WallpaperGenApp(App):
     def notify(self, *args, **kwargs):
         pass
 
-    def _suppress_fd_output(self, func, *args, **kwargs):
-        """Temporarily redirect fd 1/2 to suppress C/Rust library output."""
-        # Save original fds
-        stdout_fd = os.dup(1)
-        stderr_fd = os.dup(2)
-
-        # Redirect to devnull
-        devnull = os.open(os.devnull, os.O_WRONLY)
-        os.dup2(devnull, 1)
-        os.dup2(devnull, 2)
-
-        try:
-            result = func(*args, **kwargs)
-        finally:
-            # Restore original fds
-            os.dup2(stdout_fd, 1)
-            os.dup2(stderr_fd, 2)
-            os.close(devnull)
-            os.close(stdout_fd)
-            os.close(stderr_fd)
-
-        return result
-
     CSS = """
     Screen {
         layout: horizontal;
@@ -105,10 +77,21 @@ class WallpaperGenApp(App):
         margin-top: 2;
     }
     
+    #preview {
+        height: 1fr;
+        width: 100%;
+        content-align: center middle;
+    }
+
+    #progress {
+        width: 100%;
+        margin-bottom: 1;
+    }
+
     #status_log {
         background: $surface;
         border: solid $secondary;
-        height: 50%;
+        height: 40%;
         width: 100%;
         padding: 1;
         color: $text;
@@ -168,6 +151,15 @@ class WallpaperGenApp(App):
     TITLE = "wpgen"
     SUB_TITLE = "Fancy Wallpaper Generator"
 
+    # Pending debounce timer of the live preview
+    _preview_timer = None
+
+    # Module from load_theme_config(), applied on mount
+    theme_config = None
+
+    # Latest generation Job; a newer request cancels it
+    _job = None
+
     def compose(self) -> ComposeResult:
         with Container(id="sidebar"):
             # Manual Section
@@ -205,6 +197,14 @@ class WallpaperGenApp(App):
                 )
                 yield Button("🎨", id="pick3", classes="btn-small")
 
+            with Horizontal(classes="color-row"):
+                yield Input(
+                    placeholder="Palette from image (photo or wallpaper path)",
+                    id="palette_path",
+                    classes="color-input",
+                )
+                yield Button("🖼", id="palette_btn", classes="btn-small")
+
             # Gradient Direction (for linear gradients)
             with Container(id="gradient_options"):
                 yield Label("Gradient Direction", classes="section-title")
@@ -220,6 +220,21 @@ class WallpaperGenApp(App):
                     id="gradient_direction",
                 )
 
+                # A third colour, stop positions or another interpolation
+                # turn the blend into a multi-stop ramp
+                yield Label("Stops (optional)", classes="section-title")
+                yield Input(
+                    placeholder="One position per colour, e.g. 0, 0.3, 1",
+                    id="gradient_stops",
+                )
+
+                yield Label("Interpolation", classes="section-title")
+                yield Select.from_values(
+                    ["srgb", "linear", "oklab"],
+                    value="srgb",
+                    id="gradient_interpolation",
+                )
+
             # Mesh Options (for mesh gradients)
             with Container(id="mesh_options"):
                 yield Label("Mesh Settings", classes="section-title")
@@ -245,6 +260,13 @@ class WallpaperGenApp(App):
                     id="mesh_blob_size",
                 )
 
+                yield Label("Mesh Engine", classes="section-title")
+                yield Select.from_values(
+                    ["classic", "field"],
+                    value="classic",
+                    id="mesh_engine",
+                )
+
             with Horizontal(classes="toggle-row"):
                 yield Label("Enable Logo: ", classes="section-title")
                 yield Switch(value=False, id="logo_switch")
@@ -268,6 +290,12 @@ class WallpaperGenApp(App):
                     id="pos_select",
                 )
 
+                yield Label("Logo Scale (optional)", classes="section-title")
+                yield Input(
+                    placeholder="1.0 = native size at 1080p, scaled with height",
+                    id="logo_scale_input",
+                )
+
             yield Label("Output Directory", classes="section-title")
             yield Input(
                 placeholder="Leave empty for current directory",
@@ -280,6 +308,30 @@ class WallpaperGenApp(App):
                 id="seed_input",
             )
 
+            yield Label("Parallel Workers (optional)", classes="section-title")
+            yield Input(
+                placeholder="1 (serial)",
+                id="workers_input",
+            )
+
+            yield Label("Effect Threads (optional)", classes="section-title")
+            yield Input(
+                placeholder="1 (serial); effects run in bands on N threads",
+                id="threads_input",
+            )
+
+            yield Label("Resolutions (optional)", classes="section-title")
+            yield Input(
+                placeholder="1920x1080, 2560x1440, 1920x1200",
+                id="resolutions_input",
+            )
+
+            yield Label("Tile Rows (optional)", classes="section-title")
+            yield Input(
+                placeholder="Render in strips of N rows (large outputs)",
+                id="tile_rows_input",
+            )
+
             yield Label("Effects", classes="section-title")
 
             with Horizontal(classes="effect-row"):
@@ -316,18 +368,34 @@ class WallpaperGenApp(App):
                     placeholder="1.0", id="sharpness_input", classes="effect-input"
                 )
 
+            with Horizontal(classes="toggle-row"):
+                yield Label("Dither Gradients: ", classes="section-title")
+                yield Switch(value=False, id="dither_switch")
+
+            with Horizontal(classes="toggle-row"):
+                yield Label("Low Memory: ", classes="section-title")
+                yield Switch(value=False, id="low_memory_switch")
+
+            with Horizontal(classes="toggle-row"):
+                yield Label("Profile Stages: ", classes="section-title")
+                yield Switch(value=False, id="profile_switch")
+
             yield Button("Generate Wallpapers", variant="primary", id="gen_btn")
 
         with Container(id="main_content"):
+            yield Label("Preview", classes="section-title")
+            yield Static(id="preview")
             yield Label("Status Log", classes="section-title")
+            yield ProgressBar(total=100, show_eta=False, id="progress")
             yield Log(id="status_log")
 
     def on_mount(self) -> None:
         self.query_one("#status_log").write("Ready to generate...")
-        self._suppress_fd_output(kitchn_bridge.log_tui_start)
+        kitchn_bridge.log_tui_start()
 
         # Register and apply Kitchn theme if available
-        if HAS_THEME:
+        if self.theme_config is not None:
+            tui_theme_config = self.theme_config
             kitchn_theme = Theme(
                 name="kitchn",
                 primary=tui_theme_config.PRIMARY,
@@ -348,9 +416,9 @@ class WallpaperGenApp(App):
             )
             self.register_theme(kitchn_theme)
             self.theme = "kitchn"
-            self._suppress_fd_output(kitchn_bridge.log_tui_theme_ok)
+            kitchn_bridge.log_tui_theme_ok()
 
-        self._suppress_fd_output(kitchn_bridge.log_tui_ok)
+        kitchn_bridge.log_tui_ok()
 
         # Initial state for solid mode
         self.query_one("#row_color2").display = False
@@ -361,9 +429,62 @@ class WallpaperGenApp(App):
         # Initial state for logo
         self.query_one("#logo_section").display = False
 
+        self.schedule_preview()
+
     def on_switch_changed(self, event: Switch.Changed) -> None:
         if event.switch.id == "logo_switch":
             self.query_one("#logo_section").display = event.value
+        self.schedule_preview()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.schedule_preview()
+
+    def on_select_changed(self, event: Select.Changed) -> None:
+        self.schedule_preview()
+
+    def on_resize(self, event) -> None:
+        self.schedule_preview()
+
+    def schedule_preview(self) -> None:
+        """Re-renders the preview once input has been quiet for a moment."""
+        if self._preview_timer is not None:
+            self._preview_timer.stop()
+        self._preview_timer = self.set_timer(PREVIEW_DEBOUNCE, self.start_preview)
+
+    def start_preview(self) -> None:
+        self._preview_timer = None
+        cols, rows = self.query_one("#preview").content_size
+        if cols and rows:
+            # Snapshot on the main thread; a newer snapshot cancels this one
+            self.preview_worker(self.read_config(strict=False), cols, rows)
+
+    @work(exclusive=True, thread=True, group="preview")
+    def preview_worker(self, config: dict, cols: int, rows: int) -> None:
+        from wpgen import generator, preview
+
+        worker = get_current_worker()
+        try:
+            width, height = generator.parse_resolutions(config.get("resolutions"))[0]
+        except ValueError:
+            return
+        shown = preview.fit_size(width, height, cols, rows)
+        rendered = 0
+        for share in PREVIEW_PASSES:
+            # Never larger than the output itself
+            max_pixels = min(shown[0] * shown[1] * share, width * height)
+            if max_pixels <= rendered:
+                # The last pass already showed all the pane can
+                return
+            try:
+                img = generator.render_preview(config, max_pixels)
+                frame = preview.HalfBlockImage(preview.fit_to_cells(img, cols, rows))
+            except Exception:
+                # Half-typed values (e.g. "#12"): keep the last good preview
+                return
+            if worker.is_cancelled:
+                return
+            rendered = max_pixels
+            self.call_from_thread(self.query_one("#preview").update, frame)
 
     def on_radio_set_changed(self, event: RadioSet.Changed) -> None:
         # Show/Hide color inputs and options based on mode
@@ -381,7 +502,8 @@ class WallpaperGenApp(App):
             mesh_opts.display = False
         elif mode == "mode_linear":
             r2.display = True
-            r3.display = False
+            # Optional third stop
+            r3.display = True
             grad_opts.display = True
             mesh_opts.display = False
         elif mode == "mode_mesh":
@@ -389,6 +511,7 @@ class WallpaperGenApp(App):
             r3.display = True
             grad_opts.display = False
             mesh_opts.display = True
+        self.schedule_preview()
 
     @work(exclusive=False, thread=True)
     def pick_color_worker(self, target_input_id: str) -> None:
@@ -408,7 +531,7 @@ class WallpaperGenApp(App):
             # Update UI safely
             def update_input():
                 self.query_one(f"#{target_input_id}").value = hex_color
-                self._suppress_fd_output(kitchn_bridge.log_tui_pick_ok, hex_color)
+                kitchn_bridge.log_tui_pick_ok(hex_color)
 
             self.call_from_thread(update_input)
 
@@ -420,7 +543,9 @@ class WallpaperGenApp(App):
         try:
             bid = event.button.id
             if bid == "gen_btn":
-                self.generate()
+                self.start_generation()
+            elif bid == "palette_btn":
+                self.start_palette()
             elif bid == "pick1":
                 self.pick_color_worker("color1")
             elif bid == "pick2":
@@ -430,13 +555,13 @@ class WallpaperGenApp(App):
         except Exception as e:
             err = f"CRITICAL ERROR: {str(e)}"
             self.write_log(err)
-            self._suppress_fd_output(kitchn_bridge.log_error, err)
+            kitchn_bridge.log_error(err)
 
     def write_log(self, message: str) -> None:
         """Helper to write to log safely (can be called from threads)."""
         self.call_from_thread(self.query_one("#status_log").write, message)
         # Also log to Kitchn
-        self._suppress_fd_output(kitchn_bridge.log_info, message)
+        kitchn_bridge.log_info(message)
 
     def update_ui_colors(self, colors: list[str]) -> None:
         """Helper to update color inputs safely."""
@@ -450,130 +575,300 @@ class WallpaperGenApp(App):
         """Helper to set mesh mode safely."""
         self.query_one("#mode_mesh").value = True
 
-    @work(exclusive=True, thread=True)
-    def generate(self):
-        self.write_log("Starting generation...")
+    def read_config(self, strict: bool = True) -> dict:
+        """
+        Builds a generate_wallpaper config from the current widget values.
+        Raises FileNotFoundError if an enabled logo does not exist and
+        ValueError for an invalid resolution list, or falls back to no logo
+        and the default resolutions when strict is False.
+        """
+        mode_radio = self.query_one("#mode_select").pressed_button
+        if not mode_radio:
+            mode = "solid"
+        else:
+            mode = mode_radio.id.replace("mode_", "")
+            if mode == "linear":
+                mode = "gradient_linear"
+            if mode == "mesh":
+                mode = "gradient_mesh"
+
+        c1 = self.query_one("#color1").value or "#000000"
+        c2 = self.query_one("#color2").value or "#333333"
+        c3 = self.query_one("#color3").value or "#666666"
+
+        colors = [c1]
+        if mode == "gradient_linear":
+            colors.append(c2)
+            if self.query_one("#color3").value:
+                colors.append(c3)
+        elif mode == "gradient_mesh":
+            colors.extend([c2, c3])
+
+        logo_enabled = self.query_one("#logo_switch").value
+        logo_path = self.query_one("#logo_path").value
+
+        final_logo_path = None
+        if logo_enabled:
+            if logo_path and not os.path.exists(logo_path):
+                if strict:
+                    raise FileNotFoundError(f"Logo file not found at {logo_path}")
+                logo_path = None
+            final_logo_path = logo_path
+
+        position = self.query_one("#pos_select").value
+
+        # Parse logo scale (optional, native pixel size by default)
+        try:
+            logo_scale = float(self.query_one("#logo_scale_input").value)
+        except ValueError:
+            logo_scale = None
+        if logo_scale is not None and logo_scale <= 0:
+            logo_scale = None
+
+        output_dir = self.query_one("#output_dir").value.strip()
+        if not output_dir:
+            output_dir = "."
+
+        # Read effect values from inputs
+        def parse_float(value, default):
+            try:
+                return float(value) if value else default
+            except ValueError:
+                return default
 
-        # Reading UI state inside worker
-        # This is the tricky part. It's better to gather inputs on the main thread and pass them to the worker.
-        # But since `on_button_pressed` calls this directly, we are already in the worker context if we decorate it.
-        # A better pattern: The event handler (main thread) gathers data, then calls the worker with that data.
+        noise = parse_float(self.query_one("#noise_input").value, 0.0)
+        blur = parse_float(self.query_one("#blur_input").value, 0.0)
+        brightness = parse_float(self.query_one("#brightness_input").value, 1.0)
+        contrast = parse_float(self.query_one("#contrast_input").value, 1.0)
+        saturation = parse_float(self.query_one("#saturation_input").value, 1.0)
+        sharpness = parse_float(self.query_one("#sharpness_input").value, 1.0)
 
-        # Refactoring to: on_button_pressed gathers data -> calls self.run_generation_worker(data)
+        # Read gradient/mesh options
+        gradient_direction = self.query_one("#gradient_direction").value
+        gradient_interpolation = self.query_one("#gradient_interpolation").value
 
-        # HOWEVER, for now, let's stick to reading from worker as it usually works for simple properties in Textual.
-        # If it crashes, I will refactor.
+        # Parse stop positions (optional, evenly spaced by default)
+        try:
+            gradient_stops = [
+                float(v)
+                for v in self.query_one("#gradient_stops").value.split(",")
+                if v.strip()
+            ]
+        except ValueError:
+            gradient_stops = []
+        if len(gradient_stops) != len(colors):
+            gradient_stops = None
+        mesh_blob_count = self.query_one("#mesh_blob_count").value
+        mesh_blur_intensity = parse_float(
+            self.query_one("#mesh_blur_intensity").value, 1.0
+        )
+        mesh_blob_size = self.query_one("#mesh_blob_size").value
+        mesh_engine = self.query_one("#mesh_engine").value
+
+        # Parse blob count as int
+        try:
+            mesh_blob_count = int(mesh_blob_count) if mesh_blob_count else None
+        except ValueError:
+            mesh_blob_count = None
+
+        # Parse seed as int (optional)
+        seed_value = self.query_one("#seed_input").value
+        seed = None
+        if seed_value:
+            try:
+                seed = int(seed_value)
+            except ValueError:
+                seed = None  # Use default from generator
 
+        # Parse worker count (optional, serial by default)
         try:
-            mode_radio = self.query_one("#mode_select").pressed_button
-            if not mode_radio:
-                mode = "solid"
-            else:
-                mode = mode_radio.id.replace("mode_", "")
-                if mode == "linear":
-                    mode = "gradient_linear"
-                if mode == "mesh":
-                    mode = "gradient_mesh"
-
-            c1 = self.query_one("#color1").value or "#000000"
-            c2 = self.query_one("#color2").value or "#333333"
-            c3 = self.query_one("#color3").value or "#666666"
-
-            colors = [c1]
-            if mode == "gradient_linear":
-                colors.append(c2)
-            elif mode == "gradient_mesh":
-                colors.extend([c2, c3])
-
-            logo_enabled = self.query_one("#logo_switch").value
-            logo_path = self.query_one("#logo_path").value
-
-            final_logo_path = None
-            if logo_enabled:
-                if logo_path and not os.path.exists(logo_path):
-                    self.write_log(f"Error: Logo file not found at {logo_path}")
-                    return
-                final_logo_path = logo_path
-
-            position = self.query_one("#pos_select").value
-
-            output_dir = self.query_one("#output_dir").value.strip()
-            if not output_dir:
-                output_dir = "."
-
-            # Read effect values from inputs
-            def parse_float(value, default):
-                try:
-                    return float(value) if value else default
-                except ValueError:
-                    return default
-
-            noise = parse_float(self.query_one("#noise_input").value, 0.0)
-            blur = parse_float(self.query_one("#blur_input").value, 0.0)
-            brightness = parse_float(self.query_one("#brightness_input").value, 1.0)
-            contrast = parse_float(self.query_one("#contrast_input").value, 1.0)
-            saturation = parse_float(self.query_one("#saturation_input").value, 1.0)
-            sharpness = parse_float(self.query_one("#sharpness_input").value, 1.0)
-
-            # Read gradient/mesh options
-            gradient_direction = self.query_one("#gradient_direction").value
-            mesh_blob_count = self.query_one("#mesh_blob_count").value
-            mesh_blur_intensity = parse_float(
-                self.query_one("#mesh_blur_intensity").value, 1.0
+            workers = int(self.query_one("#workers_input").value or 1)
+        except ValueError:
+            workers = 1
+
+        # Parse effect thread count (optional, serial by default)
+        try:
+            threads = int(self.query_one("#threads_input").value or 1)
+        except ValueError:
+            threads = 1
+
+        # Parse resolution set (optional, "WxH, WxH, ...")
+        try:
+            output_sizes = resolutions.parse_resolutions(
+                self.query_one("#resolutions_input").value.strip()
             )
-            mesh_blob_size = self.query_one("#mesh_blob_size").value
+        except ValueError:
+            if strict:
+                raise
+            output_sizes = list(resolutions.RESOLUTIONS)
 
-            # Parse blob count as int
-            try:
-                mesh_blob_count = int(mesh_blob_count) if mesh_blob_count else None
-            except ValueError:
-                mesh_blob_count = None
-
-            # Parse seed as int (optional)
-            seed_value = self.query_one("#seed_input").value
-            seed = None
-            if seed_value:
-                try:
-                    seed = int(seed_value)
-                except ValueError:
-                    seed = None  # Use default from generator
-
-            config = {
-                "mode": mode,
-                "colors": colors,
-                "logo_path": final_logo_path,
-                "position": position,
-                "noise": noise,
-                "blur": blur,
-                "brightness": brightness,
-                "contrast": contrast,
-                "saturation": saturation,
-                "sharpness": sharpness,
-                "output_dir": output_dir,
-                "gradient_direction": gradient_direction,
-                "mesh_blob_count": mesh_blob_count,
-                "mesh_blur_intensity": mesh_blur_intensity,
-                "mesh_blob_size": mesh_blob_size,
-                "seed": seed,
-            }
+        # Parse tile rows (optional, whole frames by default)
+        try:
+            tile_rows = int(self.query_one("#tile_rows_input").value or 0)
+        except ValueError:
+            tile_rows = 0
+
+        config = {
+            "mode": mode,
+            "colors": colors,
+            "logo_path": final_logo_path,
+            "position": position,
+            "logo_scale": logo_scale,
+            "noise": noise,
+            "blur": blur,
+            "brightness": brightness,
+            "contrast": contrast,
+            "saturation": saturation,
+            "sharpness": sharpness,
+            "output_dir": output_dir,
+            "gradient_direction": gradient_direction,
+            "gradient_interpolation": gradient_interpolation,
+            "mesh_blob_count": mesh_blob_count,
+            "mesh_blur_intensity": mesh_blur_intensity,
+            "mesh_blob_size": mesh_blob_size,
+            "mesh_engine": mesh_engine,
+            "seed": seed,
+            "workers": workers,
+            "threads": max(1, threads),
+            "resolutions": output_sizes,
+            "tile_rows": max(0, tile_rows),
+            "dither": self.query_one("#dither_switch").value,
+            "low_memory": self.query_one("#low_memory_switch").value,
+            "instrument": self.query_one("#profile_switch").value,
+        }
+        if mode == "gradient_linear" and gradient_stops:
+            config["gradient_stops"] = gradient_stops
+        return config
+
+    def start_generation(self) -> None:
+        """
+        Snapshots the config on the main thread and starts a job for it.
+        The latest request wins: a job still running is cancelled and
+        stops at its next stage boundary.
+        """
+        try:
+            config = self.read_config()
+        except (FileNotFoundError, ValueError) as e:
+            self.query_one("#status_log").write(f"Error: {e}")
+            return
+
+        progress = self.query_one("#progress")
+        last = [-1]
+
+        def on_progress(event):
+            # Only redraw for whole percent steps
+            percent = int(event.fraction * 100)
+            if percent != last[0]:
+                last[0] = percent
+                self.call_from_thread(progress.update, progress=percent)
+
+        previous = self._job
+        if previous is not None:
+            previous.cancel()
+        self._job = Job(config, on_progress)
+        progress.update(progress=0)
+        self.generate(self._job, previous)
+
+    # Not exclusive: a worker cancelled before it started would never
+    # finish its job and leave the next one waiting for it forever.
+    # Superseded jobs are cancelled through the Job instead and stop at
+    # their first checkpoint.
+    @work(thread=True, group="generate")
+    def generate(self, job: Job, previous: Job = None) -> None:
+        from wpgen import generator, instrument
 
+        try:
+            if previous is not None:
+                # At most one stage away; no two jobs write the same files
+                previous.wait()
+            job.checkpoint()
+
+            config = job.config
+            mode = config["mode"]
+            colors = config["colors"]
+            self.write_log("Starting generation...")
             self.write_log(f"Mode: {mode}\nColors: {colors}\nProcessing...")
-            self._suppress_fd_output(kitchn_bridge.log_tui_gen, f"Mode: {mode}")
-
-            generator.generate_wallpaper(config)
+            kitchn_bridge.log_tui_gen(f"Mode: {mode}")
+
+            stages = []
+
+            def report_result(result):
+                stages.extend(result.stages or [])
+                sizes = ", ".join(f"{w}x{h}" for w, h in result.resolutions)
+                if result.error is not None:
+                    self.write_log(f"Failed {sizes}: {result.error}")
+                else:
+                    peak = ""
+                    if result.peak_rss:
+                        peak = f" (peak RSS {result.peak_rss / (1024 * 1024):.0f} MB)"
+                    self.write_log(f"Rendered {sizes}{peak}")
+                    for enc in result.encodes or []:
+                        self.write_log(
+                            f"  {os.path.basename(enc.path)}: "
+                            f"{enc.bytes / 1024:.0f} KiB in {enc.seconds:.2f}s"
+                        )
+                        if getattr(enc, "frames", None):
+                            self.write_log(
+                                f"  {enc.frames} frames in {enc.wall_seconds:.2f}s "
+                                f"({enc.fps:.1f} frames/s)"
+                            )
+
+            generator.generate_wallpaper(config, report_result, job)
+
+            if stages:
+                self.write_log(instrument.format_summary(stages))
+                for record in stages:
+                    kitchn_bridge.log_perf(instrument.record_fields(record))
 
             self.write_log("Success! Saved wallpapers")
-            self._suppress_fd_output(kitchn_bridge.log_tui_save_ok)
+            kitchn_bridge.log_tui_save_ok()
 
+        except RenderCancelled:
+            self.write_log("Cancelled: superseded by a newer request")
         except Exception as e:
             self.write_log(f"Error:\n{str(e)}")
-            self._suppress_fd_output(kitchn_bridge.log_tui_fail, str(e))
+            kitchn_bridge.log_tui_fail(str(e))
+        finally:
+            job.finish()
+
+    def start_palette(self) -> None:
+        """Fills the colour inputs from the image in #palette_path."""
+        path = self.query_one("#palette_path").value.strip()
+        if not path:
+            self.query_one("#status_log").write("Palette: enter an image path")
+            return
+        mode = self.query_one("#mode_select").pressed_button
+        count = {"mode_linear": 2, "mode_mesh": 3}.get(mode and mode.id, 1)
+        self.palette_worker(os.path.expanduser(path), count)
+
+    @work(exclusive=True, thread=True, group="palette")
+    def palette_worker(self, path: str, count: int) -> None:
+        from wpgen import palette
+
+        try:
+            result = palette.extract_palette(path, count)
+        except (OSError, ValueError) as e:
+            self.write_log(f"Palette failed: {e}")
+            return
+        self.call_from_thread(self.update_ui_colors, result.colors)
+        source = "cached" if result.cached else "extracted"
+        self.write_log(
+            f"Palette {', '.join(result.colors)} {source} from "
+            f"{os.path.basename(path)} in {result.seconds * 1000:.1f} ms"
+        )
 
 
 def main():
     """Entry point for pipx installation"""
-    app = WallpaperGenApp()
-    app.run()
+    theme_config = load_theme_config()
+    if theme_config is None:
+        print("Warning: tui_theme_config not found in ~/.config/wpgen/")
+        print("Run: kitchn stock wp-gen-tui.ing")
+    # Kitchn's library writes to the terminal; the TUI must not show that
+    with kitchn_bridge.native_output_silenced():
+        app = WallpaperGenApp()
+        app.theme_config = theme_config
+        app.run()
 
 
 if __name__ == "__main__":